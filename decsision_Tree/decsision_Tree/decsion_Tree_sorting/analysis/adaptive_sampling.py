@@ -0,0 +1,39 @@
+from statistics import NormalDist
+
+import numpy as np
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from analysis.sampling import CHUNK_SIZE, chunk_seed, draw_chunk, iteration_chunks, sample_counts
+from analysis.batch_comparisons import batch_comparison_counts
+from analysis.distributions import DEFAULT_DISTRIBUTION
+
+def confidence_half_width(counts, confidence=0.95):
+    """Half-width of the normal-approximation confidence interval on the mean."""
+    if len(counts) < 2:
+        return float("inf")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return z * np.std(counts, ddof=1) / np.sqrt(len(counts))
+
+def adaptive_counts(algorithm, n, seed, max_iterations=1000, tolerance=0.01,
+                    confidence=0.95, min_iterations=2 * CHUNK_SIZE, batch=False,
+                    distribution=DEFAULT_DISTRIBUTION):
+    """
+    Sample comparison counts one seeded chunk at a time until the confidence
+    interval on the mean is within `tolerance` (relative to the mean), or
+    `max_iterations` arrays have been sorted.
+
+    Chunks are drawn exactly as in the fixed-iteration path, so the counts are
+    a prefix of what a fixed run with the same seed would produce.
+    """
+    counts = []
+    for chunk, chunk_iterations in iteration_chunks(max_iterations):
+        seed_sequence = chunk_seed(seed, n, chunk)
+        if batch:
+            matrix = draw_chunk(n, chunk_iterations, seed_sequence, distribution)
+            counts.extend(batch_comparison_counts(algorithm, matrix).tolist())
+        else:
+            counts.extend(sample_counts(SORTING_ALGORITHMS[algorithm], n, chunk_iterations,
+                                        seed_sequence, distribution))
+        if (len(counts) >= min_iterations
+                and confidence_half_width(counts, confidence) <= tolerance * abs(np.mean(counts))):
+            break
+    return counts
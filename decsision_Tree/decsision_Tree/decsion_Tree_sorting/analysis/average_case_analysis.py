@@ -1,84 +1,188 @@
 import numpy as np
-from sorting_algorithms.bubble_sort import bubble_sort
-from sorting_algorithms.insertion_sort import insertion_sort
-from sorting_algorithms.selection_sort import selection_sort
-from sorting_algorithms.merge_sort import merge_sort
-from sorting_algorithms.quick_sort import quick_sort
-from sorting_algorithms.heap_sort import heap_sort
+from sorting_algorithms.registry import DISPLAY_NAMES, SORTING_ALGORITHMS
+from analysis.sampling import chunk_seed, iteration_chunks, sample_counts
+from analysis.parallel_engine import collect_cell_counts
+from analysis.adaptive_sampling import confidence_half_width
+from analysis.batch_comparisons import random_batch
+from analysis.profiling import profile_sort
+from analysis.distributions import DEFAULT_DISTRIBUTION, generate
+from analysis.exact_comparisons import EXACT_DISTRIBUTION, exact_comparisons
+from analysis.bounds import comparison_bounds, worst_case_lower_bound
+from decision_tree.comparison_tree import tree_statistics
 
 def yao_lower_bound(n):
-    """Compute Yao's lower bound for sorting: Ω(n log n)"""
-    return n * np.log2(n) if n > 1 else 0
+    """
+    Worst-case comparison lower bound for sorting n keys: ceil(log2 n!), not
+    the looser n log2 n. Accepts an array of sizes (see analysis.bounds).
+    """
+    return worst_case_lower_bound(n)
 
-def analyze_algorithm(sort_func, n, iterations=100):
+def analyze_algorithm(sort_func, n, iterations=100, seed=None, cache=None,
+                      distribution=DEFAULT_DISTRIBUTION):
     """
-    Run a specified sorting function multiple times on random arrays of size n.
+    Run a specified sorting function multiple times on random arrays of size n,
+    drawn from the named input distribution (see analysis.distributions).
     Returns the average number of comparisons over the given iterations.
+    With a seed, the arrays are the same ones the parallel engine draws for
+    that seed, so serial and parallel runs agree exactly. Seeded results are
+    looked up in (and stored to) `cache` if one is given.
     """
+    if seed is not None:
+        counts = cache.get(sort_func, n, iterations, seed, distribution) if cache is not None else None
+        if counts is None:
+            counts = []
+            for chunk, chunk_iterations in iteration_chunks(iterations):
+                counts.extend(sample_counts(sort_func, n, chunk_iterations, chunk_seed(seed, n, chunk),
+                                            distribution))
+            if cache is not None:
+                cache.put(sort_func, n, iterations, seed, counts, distribution)
+        return np.mean(counts)
+
     counts = []
     for _ in range(iterations):
-        arr = np.random.randint(1, 100, n).tolist()
+        if distribution == DEFAULT_DISTRIBUTION:
+            arr = np.random.randint(1, 100, n).tolist()
+        else:
+            arr = generate(distribution, n)
         comp = sort_func(arr, track_comparisons=True)
         counts.append(comp)
     return np.mean(counts)
 
-def run_analysis():
+DEFAULT_TEST_SIZES = [10, 20, 50, 100]
+DEFAULT_TREE_SIZE = 6
+# Arrays per size used to time and measure the algorithms in `profile`.
+PROFILE_ITERATIONS = 10
+
+def run_analysis(test_sizes=None, iterations=100, seed=None, max_workers=1, cache=None,
+                 batch=False, tolerance=None, confidence=0.95, on_size_complete=None,
+                 tree_size=DEFAULT_TREE_SIZE, profile=None, distribution=DEFAULT_DISTRIBUTION):
     """
     Runs average-case analysis for each sorting algorithm on multiple input sizes.
+    The (algorithm, n) cells are spread over `max_workers` processes (None means
+    one per CPU). Results are reproducible for a given seed whatever the worker
+    count; without a seed a fresh one is drawn and reported back. Cells found in
+    `cache` (an AnalysisCache) are served from it instead of being recomputed.
+    With batch=True each cell is counted by the vectorised NumPy counters, which
+    give the same numbers as the scalar path.
+    If `tolerance` is set, `iterations` becomes an upper limit: sampling for a
+    cell stops once the `confidence` interval on its mean is within
+    tolerance * mean.
+    Arrays are drawn from the named `distribution` (see analysis.distributions;
+    by default integers in [1, 100)). For EXACT_DISTRIBUTION (random
+    permutations) the cells that analysis.exact_comparisons can solve are not
+    sampled: their average and variance are exact, found from the decision
+    tree for n <= tree_size and from closed forms above it, and "exact" names
+    the method.
+    The sampled cells of all sizes run together; `on_size_complete(n,
+    results_for_n)` is called as each size finishes, not necessarily in order.
+    `profile` names registered algorithms whose time per sort and peak memory
+    are measured on PROFILE_ITERATIONS of the seeded arrays of each size, e.g.
+    analysis.profiling.MERGE_SORT_VARIANTS to compare the merge sorts.
     Returns a dictionary containing:
-      - Average comparisons per algorithm.
-      - Yao's lower bound for each test size.
-      - Ratio of average comparisons to Yao's bound.
-      - Simulated examples of decision tree configurations.
+      - Average comparisons, variance, iterations used and the half-width of
+        the `confidence` interval on the mean ("confidence_half_width", 0.0
+        for exact cells) per algorithm.
+      - The worst-case lower bound ceil(log2 n!) ("yao_lower_bound") and the
+        average-case lower bound over random permutations for each test
+        size (see analysis.bounds), and the ratios of average comparisons to
+        each.
+      - With `profile`, seconds_per_sort and peak_bytes per size and algorithm.
+      - The exact comparison decision tree of each algorithm for inputs of
+        size `tree_size` (average, maximum and minimum depth over all
+        tree_size! permutations, tree and DAG node counts).
     """
-    algorithms = {
-        "Bubble Sort": bubble_sort,
-        "Insertion Sort": insertion_sort,
-        "Selection Sort": selection_sort,
-        "Merge Sort": merge_sort,
-        "Quick Sort": quick_sort,
-        "Heap Sort": heap_sort
+    test_sizes = DEFAULT_TEST_SIZES if test_sizes is None else list(test_sizes)
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % (2 ** 32))
+    bounds = comparison_bounds(np.asarray(test_sizes, dtype=np.int64))
+    size_bounds = {
+        n: (int(bounds["worst_case"][position]), float(bounds["average_case"][position]))
+        for position, n in enumerate(test_sizes)
     }
-    
-    test_sizes = [10, 20, 50, 100]
+    exact = {n: {} for n in test_sizes}
+    if distribution == EXACT_DISTRIBUTION:
+        for n in exact:
+            for algorithm in SORTING_ALGORITHMS:
+                result = exact_comparisons(algorithm, n, tree_size)
+                if result is not None:
+                    exact[n][algorithm] = result
     analysis_results = {}
-    
-    for n in test_sizes:
+
+    def size_complete(n, counts):
         algo_results = {}
-        yao = yao_lower_bound(n)
-        for name, func in algorithms.items():
-            avg_comps = analyze_algorithm(func, n)
-            algo_results[name] = {
-                "average_comparisons": avg_comps,
-                "yao_lower_bound": yao,
-                "ratio_to_yao": avg_comps / yao if yao != 0 else None
-            }
+        yao, average_bound = size_bounds[n]
+        for algorithm in SORTING_ALGORITHMS:
+            if algorithm in exact[n]:
+                avg_comps = exact[n][algorithm]["mean"]
+                cell_results = {
+                    "average_comparisons": avg_comps,
+                    "variance": exact[n][algorithm]["variance"],
+                    "iterations": 0,
+                    "confidence_half_width": 0.0,
+                    "exact": exact[n][algorithm]["method"]
+                }
+            else:
+                cell = counts[algorithm]
+                avg_comps = np.mean(cell)
+                cell_results = {
+                    "average_comparisons": avg_comps,
+                    "variance": float(np.var(cell, ddof=1)) if len(cell) > 1 else 0.0,
+                    "iterations": len(cell),
+                    "confidence_half_width": float(confidence_half_width(cell, confidence)) if len(cell) > 1 else None,
+                    "exact": None
+                }
+            cell_results["yao_lower_bound"] = yao
+            cell_results["ratio_to_yao"] = avg_comps / yao if yao != 0 else None
+            cell_results["average_case_lower_bound"] = average_bound
+            cell_results["ratio_to_average_bound"] = avg_comps / average_bound if average_bound != 0 else None
+            algo_results[DISPLAY_NAMES[algorithm]] = cell_results
         analysis_results[n] = algo_results
-    
-    # Simulated examples of decision tree configurations.
-    # These are dummy data to illustrate balanced, mixed, and imbalanced trees.
+        if on_size_complete is not None:
+            on_size_complete(n, algo_results)
+
+    sampled = [
+        (algorithm, n) for n in exact for algorithm in SORTING_ALGORITHMS
+        if algorithm not in exact[n]
+    ]
+    for n in exact:
+        if len(exact[n]) == len(SORTING_ALGORITHMS):
+            size_complete(n, {})
+    if sampled:
+        collect_cell_counts(sampled, iterations, seed, max_workers, cache, batch, tolerance,
+                            confidence, distribution, on_size_complete=size_complete)
+    analysis_results = {n: analysis_results[n] for n in exact}
+
+    # Profiled after the counting so the process pool is idle while timing.
+    profiles = {}
+    if profile:
+        for n in exact:
+            arrays = random_batch(n, PROFILE_ITERATIONS, seed, distribution).tolist()
+            profiles[n] = {
+                DISPLAY_NAMES[algorithm]: profile_sort(SORTING_ALGORITHMS[algorithm], arrays)
+                for algorithm in profile
+            }
+
+    # Exact decision trees over all tree_size! orderings of tree_size keys,
+    # whatever the test sizes. (For EXACT_DISTRIBUTION, exact_comparisons has
+    # also built one per algorithm for each tested n <= tree_size, over n!
+    # inputs each.)
     tree_configurations = {
-        "balanced_trees": {
-            "description": "Example of two balanced decision trees.",
-            "average_depth": 4,
-            "max_depth": 5
-        },
-        "mixed_trees": {
-            "description": "Example of one balanced and one imbalanced decision tree.",
-            "balanced_tree": {"average_depth": 4, "max_depth": 5},
-            "imbalanced_tree": {"average_depth": 8, "max_depth": 12}
-        },
-        "imbalanced_trees": {
-            "description": "Example of two imbalanced decision trees.",
-            "average_depth": 10,
-            "max_depth": 15
-        }
+        DISPLAY_NAMES[algorithm]: tree_statistics(algorithm, tree_size)
+        for algorithm in SORTING_ALGORITHMS
     }
-    
-    return {
+
+    results = {
         "analysis_results": analysis_results,
-        "tree_configurations": tree_configurations
+        "tree_configurations": tree_configurations,
+        "tree_size": tree_size,
+        "seed": seed,
+        "distribution": distribution,
+        "confidence": confidence,
+        "tolerance": tolerance
     }
+    if profile:
+        results["profiles"] = profiles
+    return results
 
 if __name__ == "__main__":
     results = run_analysis()
@@ -0,0 +1,272 @@
+import numpy as np
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from analysis.sampling import chunk_seed, draw_chunk, iteration_chunks
+from analysis.distributions import DEFAULT_DISTRIBUTION, draw_arrays
+
+# Batched comparison counting: each function takes an (iterations x n) matrix of
+# inputs and returns the number of comparisons the matching sorting_algorithms
+# implementation makes on every row, without sorting the rows one by one in
+# Python. The counts are exact, not estimates.
+
+def random_batch(n, iterations=100, seed=None, distribution=DEFAULT_DISTRIBUTION):
+    """
+    Draw an (iterations x n) matrix of arrays from the named input distribution
+    (by default integers in [1, 100)). With a seed, row k is the same array the
+    scalar analyze_algorithm path sorts in iteration k for that seed.
+    """
+    if seed is None:
+        if distribution == DEFAULT_DISTRIBUTION:
+            return np.random.randint(1, 100, (iterations, n))
+        return draw_arrays(distribution, n, iterations, np.random.default_rng())
+    blocks = [
+        draw_chunk(n, chunk_iterations, chunk_seed(seed, n, chunk), distribution)
+        for chunk, chunk_iterations in iteration_chunks(iterations)
+    ]
+    return np.concatenate(blocks) if blocks else np.empty((0, n), dtype=np.int64)
+
+def dense_ranks(matrix):
+    """Replace each row's values by 0-based ranks, giving equal values equal ranks."""
+    rows, n = matrix.shape
+    if n == 0:
+        return matrix.astype(np.int64)
+    order = np.argsort(matrix, axis=1, kind="stable")
+    sorted_values = np.take_along_axis(matrix, order, axis=1)
+    steps = np.zeros((rows, n), dtype=np.int64)
+    steps[:, 1:] = sorted_values[:, 1:] != sorted_values[:, :-1]
+    ranks = np.empty_like(steps)
+    np.put_along_axis(ranks, order, np.cumsum(steps, axis=1), axis=1)
+    return ranks
+
+def count_inversions(matrix):
+    """
+    Number of pairs j < i with a[j] > a[i] in every row, via a bottom-up merge
+    over the whole batch at once: O(iterations * n log n).
+    """
+    matrix = np.asarray(matrix)
+    rows, n = matrix.shape
+    inversions = np.zeros(rows, dtype=np.int64)
+    if n < 2:
+        return inversions
+    ranks = dense_ranks(matrix)
+    size = 1 << (n - 1).bit_length()
+    # Pad with a value above every rank; padding sits at the end of each row,
+    # so it never forms an inversion.
+    work = np.full((rows, size), n, dtype=np.int64)
+    work[:, :n] = ranks
+    base = n + 1
+    width = 1
+    while width < size:
+        blocks = work.reshape(rows, size // (2 * width), 2, width)
+        groups = rows * (size // (2 * width))
+        offsets = np.arange(groups, dtype=np.int64).reshape(rows, -1, 1) * base
+        left = (blocks[:, :, 0, :] + offsets).ravel()
+        right = (blocks[:, :, 1, :] + offsets).ravel()
+        # Offsetting each block by its group id keeps the flattened left halves
+        # globally sorted, so one searchsorted answers count(left <= r) for all.
+        not_greater = np.searchsorted(left, right, side="right") - np.repeat(
+            np.arange(groups, dtype=np.int64) * width, width
+        )
+        inversions += (width - not_greater).reshape(rows, -1).sum(axis=1)
+        # Each block holds two sorted runs, which a stable (run-merging) sort
+        # combines in linear time.
+        work = np.sort(work.reshape(rows, -1, 2 * width), axis=2, kind="stable").reshape(rows, size)
+        width *= 2
+    return inversions
+
+def bubble_sort_counts(matrix):
+    # This bubble sort has no early exit: every pass runs to the end.
+    rows, n = np.shape(matrix)
+    return np.full(rows, n * (n - 1) // 2, dtype=np.int64)
+
+def selection_sort_counts(matrix):
+    rows, n = np.shape(matrix)
+    return np.full(rows, n * (n - 1) // 2, dtype=np.int64)
+
+def insertion_sort_counts(matrix):
+    """
+    Each key is compared with every larger element before it, plus once more
+    with the element that stops it, unless it travels all the way to the front.
+    """
+    matrix = np.asarray(matrix)
+    rows, n = matrix.shape
+    if n < 2:
+        return np.zeros(rows, dtype=np.int64)
+    prefix_min = np.minimum.accumulate(matrix, axis=1)
+    stopped = (prefix_min[:, :-1] <= matrix[:, 1:]).sum(axis=1)
+    return count_inversions(matrix) + stopped
+
+def merge_sort_counts(matrix):
+    """
+    Simulates the top-down merges for the whole batch. Merging sorted halves L
+    and R costs |L| + |R| minus the elements left over when one side runs out.
+    """
+    work = np.array(matrix, copy=True)
+    rows, n = work.shape
+    counts = np.zeros(rows, dtype=np.int64)
+
+    def merge_sort_recursive(left, right):
+        if right - left <= 1:
+            return
+        mid = (left + right) // 2
+        merge_sort_recursive(left, mid)
+        merge_sort_recursive(mid, right)
+        left_part = work[:, left:mid]
+        right_part = work[:, mid:right]
+        left_max = left_part[:, -1:]
+        right_max = right_part[:, -1:]
+        # Ties go to the left, so the left side runs out first iff its maximum
+        # is <= the right maximum.
+        left_first = (left_max <= right_max)[:, 0]
+        leftover = np.where(
+            left_first,
+            (right_part >= left_max).sum(axis=1),
+            (left_part > right_max).sum(axis=1)
+        )
+        counts[:] += (right - left) - leftover
+        work[:, left:right] = np.sort(work[:, left:right], axis=1, kind="stable")
+
+    merge_sort_recursive(0, n)
+    return counts
+
+def heap_sort_counts(matrix):
+    """
+    Runs heap sort on every row in lockstep. Subtrees at the same depth are
+    disjoint, so heap construction sifts a whole level of nodes at once.
+    """
+    rows, n = np.shape(matrix)
+    work = np.array(matrix, copy=True).ravel()
+    counts = np.zeros(rows, dtype=np.int64)
+
+    def sift_down(row_ids, start, size):
+        # Positions are flat indices into `work`; `base` is each row's offset.
+        base = row_ids * n
+        current = start
+        while base.size:
+            left = 2 * current + 1
+            right = left + 1
+            has_left = left < size
+            has_right = right < size
+            counts[:] += np.bincount(base // n, weights=has_left.astype(np.int64) + has_right,
+                                     minlength=rows).astype(np.int64)
+            largest = current.copy()
+            m = has_left
+            bigger = work[base[m] + left[m]] > work[base[m] + current[m]]
+            largest[m] = np.where(bigger, left[m], current[m])
+            m = has_right
+            bigger = work[base[m] + right[m]] > work[base[m] + largest[m]]
+            largest[m] = np.where(bigger, right[m], largest[m])
+            moved = largest != current
+            base, current, largest = base[moved], current[moved], largest[moved]
+            values = work[base + current]
+            work[base + current] = work[base + largest]
+            work[base + largest] = values
+            current = largest
+
+    # Build a max heap, one level of internal nodes at a time.
+    last_internal = n // 2 - 1
+    depth = (last_internal + 1).bit_length() - 1 if last_internal >= 0 else -1
+    for d in range(depth, -1, -1):
+        nodes = np.arange((1 << d) - 1, min((1 << (d + 1)) - 1, last_internal + 1))
+        row_ids = np.repeat(np.arange(rows), nodes.size)
+        sift_down(row_ids, np.tile(nodes, rows), n)
+
+    # Extract elements one by one.
+    all_rows = np.arange(rows)
+    heap = work.reshape(rows, n)
+    for i in range(n - 1, 0, -1):
+        heap[:, [0, i]] = heap[:, [i, 0]]
+        sift_down(all_rows, np.zeros(rows, dtype=np.int64), i)
+    return counts
+
+def quick_sort_counts(matrix):
+    """
+    Runs Lomuto quick sort on every row at once, one recursion level per step.
+
+    A partition of [lo, hi) always costs hi - lo - 1 comparisons; what matters is
+    where the elements end up, because the next pivots are the last elements of
+    the two parts. Elements <= pivot keep their order. An element that ends in
+    the right part at position q came from following q -> (its small-index)
+    while position q was filled by a small element, which is resolved for all
+    segments together by pointer jumping.
+    """
+    work = np.array(matrix, copy=True).ravel()
+    rows, n = np.shape(matrix)
+    counts = np.zeros(rows, dtype=np.int64)
+    if n < 2:
+        return counts
+    lo = np.arange(rows, dtype=np.int64) * n
+    hi = lo + n
+
+    while lo.size:
+        keep = hi - lo >= 2
+        lo, hi = lo[keep], hi[keep]
+        if not lo.size:
+            break
+        seg_len = hi - lo - 1   # Elements compared against the pivot
+        seg = np.repeat(np.arange(lo.size), seg_len)
+        seg_offset = np.cumsum(seg_len) - seg_len
+        local = np.arange(seg.size) - seg_offset[seg]
+        positions = lo[seg] + local
+        values = work[positions]
+        pivots = work[hi - 1]
+        small = values <= pivots[seg]
+
+        # A segment of k equal values only ever peels off its last element:
+        # k(k-1)/2 comparisons in total, and nothing left to rearrange.
+        flat = (np.minimum(np.minimum.reduceat(values, seg_offset), pivots)
+                == np.maximum(np.maximum.reduceat(values, seg_offset), pivots))
+        seg_cost = np.where(flat, (seg_len + 1) * seg_len // 2, seg_len)
+        counts += np.bincount(lo // n, weights=seg_cost, minlength=rows).astype(np.int64)
+
+        small_total = np.cumsum(small)
+        small_before = small_total - small
+        small_before -= (small_total - small)[seg_offset][seg]
+        smalls = np.bincount(seg, weights=small, minlength=lo.size).astype(np.int64)
+        split = lo + smalls     # Final pivot position
+
+        # pointer[k]: slot whose original element ends up at position k.
+        pointer = np.arange(seg.size)
+        pointer[small] = seg_offset[seg[small]] + small_before[small]
+        while True:
+            jumped = pointer[pointer]
+            if np.array_equal(jumped, pointer):
+                break
+            pointer = jumped
+
+        # Elements <= pivot move to the front in order; every position in the
+        # right part takes the value its pointer chain ends at.
+        right_part = local >= smalls[seg]
+        destinations = positions[right_part]
+        # The first element of the right part swaps with the pivot.
+        front = destinations == split[seg[right_part]]
+        destinations[front] = hi[seg[right_part][front]] - 1
+        right_values = values[pointer[right_part]]
+        work[lo[seg[small]] + small_before[small]] = values[small]
+        work[destinations] = right_values
+        work[split] = pivots
+
+        lo, hi = lo[~flat], hi[~flat]
+        split = split[~flat]
+        lo, hi = np.concatenate([lo, split + 1]), np.concatenate([split, hi])
+    return counts
+
+BATCH_COUNTERS = {
+    "bubble_sort": bubble_sort_counts,
+    "insertion_sort": insertion_sort_counts,
+    "selection_sort": selection_sort_counts,
+    "merge_sort": merge_sort_counts,
+    "quick_sort": quick_sort_counts,
+    "heap_sort": heap_sort_counts
+}
+
+def batch_comparison_counts(algorithm, matrix):
+    """
+    Comparison counts for every row of `matrix` under a registered algorithm.
+    Algorithms without a batched counter fall back to sorting each row.
+    """
+    counter = BATCH_COUNTERS.get(algorithm)
+    if counter is not None:
+        return counter(np.asarray(matrix))
+    sort_func = SORTING_ALGORITHMS[algorithm]
+    return np.array([sort_func(row.tolist(), track_comparisons=True) for row in np.asarray(matrix)],
+                    dtype=np.int64)
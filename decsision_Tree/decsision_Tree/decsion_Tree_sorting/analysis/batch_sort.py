@@ -0,0 +1,49 @@
+import numpy as np
+from analysis.batch_comparisons import batch_comparison_counts
+
+# Sorting many arrays at once for /api/sort/batch. The sorted values do not
+# depend on the algorithm, so rows are always sorted by numpy along an axis;
+# an algorithm is only consulted when its comparison counts are wanted.
+
+def sort_matrix(matrix, algorithm=None, return_order=False):
+    """
+    Sort every row of a 2-D array in one vectorised call.
+    Returns a dictionary with:
+      - sorted: the sorted rows, as an array of the same shape.
+      - order: with return_order, the stable argsort of each row (the input
+        positions in sorted order); otherwise None.
+      - comparisons: with an algorithm, the comparisons it makes on each row
+        (see batch_comparison_counts); otherwise None.
+    """
+    matrix = np.asarray(matrix)
+    if return_order:
+        order = np.argsort(matrix, axis=1, kind="stable")
+        sorted_rows = np.take_along_axis(matrix, order, axis=1)
+    else:
+        order = None
+        sorted_rows = np.sort(matrix, axis=1)
+    comparisons = batch_comparison_counts(algorithm, matrix) if algorithm is not None else None
+    return {"sorted": sorted_rows, "order": order, "comparisons": comparisons}
+
+def sort_arrays(arrays, algorithm=None, return_order=False):
+    """
+    sort_matrix for a list of 1-D arrays of any lengths: arrays of equal length
+    and dtype are stacked and sorted together. Returns the same keys, each
+    holding a list aligned with `arrays` (order and comparisons are None when
+    not asked for).
+    """
+    groups = {}
+    for index, arr in enumerate(arrays):
+        groups.setdefault((len(arr), arr.dtype.str), []).append(index)
+    result = {
+        "sorted": [None] * len(arrays),
+        "order": [None] * len(arrays) if return_order else None,
+        "comparisons": [None] * len(arrays) if algorithm is not None else None
+    }
+    for indices in groups.values():
+        group = sort_matrix(np.stack([arrays[i] for i in indices]), algorithm, return_order)
+        for key, rows in result.items():
+            if rows is not None:
+                for position, index in enumerate(indices):
+                    rows[index] = group[key][position]
+    return result
@@ -0,0 +1,252 @@
+import argparse
+import csv
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from analysis.distributions import generate
+from analysis.profiling import tracing
+
+DEFAULT_BENCHMARK_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_BENCHMARK_DISTRIBUTIONS = ["random", "sorted", "reversed", "few_unique", "organ_pipe"]
+
+# Per-cell wall time limit: a size whose run is predicted to exceed it (from
+# the growth seen at the smaller sizes) is skipped, so quadratic algorithms
+# drop out of the large sizes instead of running for hours.
+DEFAULT_TIME_LIMIT = 10.0
+
+# Relative slack allowed before a noisy metric counts as a regression.
+# Comparison and move counts are deterministic and must not increase at all.
+DEFAULT_TIME_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.10
+
+CSV_FIELDS = [
+    "algorithm", "distribution", "n", "status", "comparisons", "swaps", "moves",
+    "time_ns", "peak_bytes", "net_blocks"
+]
+
+class OperationCounter:
+    """Tracer that counts operations by type and element writes."""
+    __slots__ = ("counts", "moves")
+
+    def __init__(self):
+        self.counts = {}
+        self.moves = 0
+
+    def record(self, op_type, indices, values, writes=()):
+        self.counts[op_type] = self.counts.get(op_type, 0) + 1
+        self.moves += len(writes)
+
+def measure(sort_func, arr, repeat=3, memory=True):
+    """
+    Benchmark one sort of `arr` (which is left untouched). Each metric gets its
+    own pass so that tracing does not distort the timings:
+      - time_ns: best of `repeat` untraced runs, by perf_counter_ns (a single
+        run if the first one takes over a second).
+      - comparisons, swaps, moves: from a run with an OperationCounter tracer;
+        moves counts every element written.
+      - peak_bytes, net_blocks: from a run under tracemalloc; peak memory
+        allocated beyond the input copy, and the number of memory blocks the
+        sort left allocated (the returned list, caches...). Python does not
+        expose a total allocation count, so net blocks stand in for it.
+    """
+    times = []
+    for _ in range(repeat):
+        data = list(arr)
+        start = time.perf_counter_ns()
+        sort_func(data)
+        times.append(time.perf_counter_ns() - start)
+        if times[0] > 1e9:
+            break
+
+    counter = OperationCounter()
+    sort_func(list(arr), tracer=counter)
+    result = {
+        "comparisons": counter.counts.get("compare", 0),
+        "swaps": counter.counts.get("swap", 0),
+        "moves": counter.moves,
+        "time_ns": min(times),
+        "peak_bytes": None,
+        "net_blocks": None
+    }
+
+    if memory:
+        with tracing():
+            data = list(arr)
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            sort_func(data)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+            after = tracemalloc.take_snapshot()
+            result["net_blocks"] = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    return result
+
+def _predicted_seconds(history, n):
+    """Extrapolate the run time at size n from (n, seconds) pairs measured so far."""
+    if not history:
+        return 0.0
+    last_n, last_seconds = history[-1]
+    exponent = 2.0
+    if len(history) > 1:
+        prev_n, prev_seconds = history[-2]
+        if prev_seconds > 0 and last_seconds > 0 and last_n > prev_n:
+            exponent = math.log(last_seconds / prev_seconds) / math.log(last_n / prev_n)
+            exponent = min(max(exponent, 1.0), 2.0)
+    return last_seconds * (n / last_n) ** exponent
+
+def run_benchmark(algorithms=None, distributions=None, sizes=None, seed=0, repeat=3,
+                  memory=True, time_limit=DEFAULT_TIME_LIMIT, progress=None):
+    """
+    Benchmark every (algorithm, distribution, size) cell.
+
+    Parameters:
+    - algorithms: registered algorithm names (default: all of SORTING_ALGORITHMS).
+    - distributions: names from analysis.distributions.DISTRIBUTIONS (default:
+      DEFAULT_BENCHMARK_DISTRIBUTIONS).
+    - sizes: input sizes, run in increasing order (default: DEFAULT_BENCHMARK_SIZES).
+    - seed: seed for the generated inputs; every algorithm sorts the same arrays.
+    - repeat, memory: see measure().
+    - time_limit: seconds; larger sizes predicted to exceed it are skipped.
+    - progress: optional callable receiving each finished record.
+
+    Returns a list of records with the CSV_FIELDS keys; skipped cells have
+    status "skipped" and no metrics.
+    """
+    algorithms = list(SORTING_ALGORITHMS) if algorithms is None else list(algorithms)
+    distributions = list(DEFAULT_BENCHMARK_DISTRIBUTIONS if distributions is None else distributions)
+    sizes = sorted(DEFAULT_BENCHMARK_SIZES if sizes is None else sizes)
+    records = []
+    for distribution in distributions:
+        inputs = {n: generate(distribution, n, seed=[seed, n]) for n in sizes}
+        for algorithm in algorithms:
+            sort_func = SORTING_ALGORITHMS[algorithm]
+            history = []
+            for n in sizes:
+                record = {"algorithm": algorithm, "distribution": distribution, "n": n}
+                if _predicted_seconds(history, n) > time_limit:
+                    record.update({field: None for field in CSV_FIELDS[4:]}, status="skipped")
+                else:
+                    record.update(measure(sort_func, inputs[n], repeat, memory), status="ok")
+                    history.append((n, record["time_ns"] / 1e9))
+                records.append(record)
+                if progress is not None:
+                    progress(record)
+    return records
+
+def save_json(records, path):
+    """Write records, with the platform they were measured on, as a JSON baseline."""
+    payload = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": time.time(),
+        "records": records
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+def save_csv(records, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({field: record.get(field) for field in CSV_FIELDS})
+
+def load_baseline(path):
+    """Records from a baseline written by save_json or save_csv."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row["n"] = int(row["n"])
+            for field in CSV_FIELDS[4:]:
+                row[field] = int(row[field]) if row[field] not in ("", None) else None
+        return rows
+    with open(path) as f:
+        return json.load(f)["records"]
+
+def find_regressions(records, baseline, time_tolerance=DEFAULT_TIME_TOLERANCE,
+                     memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """
+    Compare records with a baseline cell by cell. A cell regresses when its
+    comparison, swap or move count went up at all, its time went up by more
+    than time_tolerance, or its peak memory by more than memory_tolerance.
+    Cells missing or skipped on either side are ignored.
+    Returns a list of {algorithm, distribution, n, metric, baseline, current}.
+    """
+    reference = {(r["algorithm"], r["distribution"], r["n"]): r for r in baseline}
+    limits = {
+        "comparisons": 0.0, "swaps": 0.0, "moves": 0.0,
+        "time_ns": time_tolerance, "peak_bytes": memory_tolerance
+    }
+    regressions = []
+    for record in records:
+        old = reference.get((record["algorithm"], record["distribution"], record["n"]))
+        if old is None or record.get("status") != "ok" or old.get("status") != "ok":
+            continue
+        for metric, tolerance in limits.items():
+            before, after = old.get(metric), record.get(metric)
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance):
+                regressions.append({
+                    "algorithm": record["algorithm"],
+                    "distribution": record["distribution"],
+                    "n": record["n"],
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after
+                })
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the registered sorting algorithms.")
+    parser.add_argument("--algorithms", help="comma-separated algorithm names (default: all)")
+    parser.add_argument("--distributions", help="comma-separated distributions (default: "
+                        + ",".join(DEFAULT_BENCHMARK_DISTRIBUTIONS) + ")")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_BENCHMARK_SIZES)))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--csv", help="write results to this CSV file")
+    parser.add_argument("--baseline", help="JSON or CSV baseline to check for regressions")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    def report(record):
+        if record["status"] == "ok":
+            print(f"{record['algorithm']:>22} {record['distribution']:>10} {record['n']:>8}"
+                  f"  {record['time_ns'] / 1e6:10.2f} ms  {record['comparisons']:>12} cmp"
+                  f"  {record['moves']:>12} moves")
+        else:
+            print(f"{record['algorithm']:>22} {record['distribution']:>10} {record['n']:>8}  skipped")
+
+    records = run_benchmark(
+        algorithms=args.algorithms.split(",") if args.algorithms else None,
+        distributions=args.distributions.split(",") if args.distributions else None,
+        sizes=[int(size) for size in args.sizes.split(",")],
+        seed=args.seed, repeat=args.repeat, memory=not args.no_memory,
+        time_limit=args.time_limit, progress=report
+    )
+    if args.json:
+        save_json(records, args.json)
+    if args.csv:
+        save_csv(records, args.csv)
+    if args.baseline:
+        regressions = find_regressions(records, load_baseline(args.baseline),
+                                       args.time_tolerance, args.memory_tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['algorithm']} {r['distribution']} n={r['n']}: "
+                  f"{r['metric']} {r['baseline']} -> {r['current']}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
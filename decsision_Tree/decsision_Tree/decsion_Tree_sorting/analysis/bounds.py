@@ -0,0 +1,103 @@
+import math
+
+import numpy as np
+
+# Lower bounds on the comparisons needed to sort n distinct keys, vectorised
+# over arrays of sizes: every function accepts an int or an array of ints and
+# returns a result of the same shape, without a Python loop per size.
+
+# Sizes below this are looked up in tables built once, exactly, from the
+# integer factorials; larger sizes use Stirling's series for ln n!.
+EXACT_TABLE_SIZE = 1024
+
+
+def _build_tables():
+    log2_factorial = np.empty(EXACT_TABLE_SIZE)
+    ceil_log2 = np.empty(EXACT_TABLE_SIZE, dtype=np.int64)
+    floor_log2 = np.empty(EXACT_TABLE_SIZE, dtype=np.int64)
+    factorial = 1
+    for k in range(EXACT_TABLE_SIZE):
+        factorial *= max(k, 1)
+        log2_factorial[k] = math.log2(factorial)
+        ceil_log2[k] = (factorial - 1).bit_length()
+        floor_log2[k] = factorial.bit_length() - 1
+    return log2_factorial, ceil_log2, floor_log2
+
+
+_LOG2_FACTORIAL, _CEIL_LOG2_FACTORIAL, _FLOOR_LOG2_FACTORIAL = _build_tables()
+
+
+def _sizes(n):
+    sizes = np.asarray(n)
+    if not np.issubdtype(sizes.dtype, np.integer):
+        raise ValueError("Sizes must be integers")
+    if np.any(sizes < 0):
+        raise ValueError("Sizes must be non-negative")
+    return sizes.astype(np.int64)
+
+
+def _shaped(n, values):
+    return values if np.ndim(n) else values[()]
+
+
+def log2_factorial(n):
+    """
+    log2(n!), the entropy in bits of a uniformly random permutation of n keys:
+    lgamma(n + 1) / ln 2, read from the exact table for small n and computed
+    with Stirling's series (accurate to float precision from
+    EXACT_TABLE_SIZE on) above it.
+    """
+    sizes = _sizes(n)
+    small = sizes < EXACT_TABLE_SIZE
+    result = np.empty(sizes.shape)
+    result[small] = _LOG2_FACTORIAL[sizes[small]]
+    large = sizes[~small].astype(np.float64)
+    ln_factorial = (large * np.log(large) - large + 0.5 * np.log(2 * np.pi * large)
+                    + 1 / (12 * large) - 1 / (360 * large ** 3) + 1 / (1260 * large ** 5))
+    result[~small] = ln_factorial / np.log(2)
+    return _shaped(n, result)
+
+
+def worst_case_lower_bound(n):
+    """
+    ceil(log2 n!): no comparison sort can sort every input of size n with
+    fewer comparisons, as its decision tree needs n! leaves. Exact below
+    EXACT_TABLE_SIZE; above it, exact unless log2 n! lies within float
+    rounding of an integer.
+    """
+    sizes = _sizes(n)
+    small = sizes < EXACT_TABLE_SIZE
+    result = np.empty(sizes.shape, dtype=np.int64)
+    result[small] = _CEIL_LOG2_FACTORIAL[sizes[small]]
+    result[~small] = np.ceil(log2_factorial(sizes[~small]))
+    return _shaped(n, result)
+
+
+def average_case_lower_bound(n):
+    """
+    Fewest comparisons any comparison sort can average over the n! orderings:
+    the least average leaf depth of a binary tree with L = n! leaves, which
+    is q + 2 - 2^(1 - f) for log2 L = q + f (q an integer, 0 <= f < 1). It is
+    at least the entropy log2 n! and exceeds it by under 0.09.
+    """
+    sizes = _sizes(n)
+    entropy = np.asarray(log2_factorial(sizes))
+    small = sizes < EXACT_TABLE_SIZE
+    whole = np.empty(sizes.shape)
+    whole[small] = _FLOOR_LOG2_FACTORIAL[sizes[small]]
+    whole[~small] = np.floor(entropy[~small])
+    fraction = np.clip(entropy - whole, 0.0, 1.0)
+    return _shaped(n, whole + 2 - 2 ** (1 - fraction))
+
+
+def comparison_bounds(sizes):
+    """
+    All three bounds for an array of sizes, as arrays keyed by "entropy"
+    (log2 n!), "average_case" and "worst_case".
+    """
+    sizes = _sizes(sizes)
+    return {
+        "entropy": log2_factorial(sizes),
+        "average_case": average_case_lower_bound(sizes),
+        "worst_case": worst_case_lower_bound(sizes)
+    }
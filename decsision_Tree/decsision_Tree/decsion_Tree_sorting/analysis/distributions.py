@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+
+# Input distributions for benchmarks and analysis. Every generator takes the
+# size n and a numpy Generator and returns an int64 array of length n, built
+# with vectorised numpy operations rather than Python loops.
+
+def small_range_values(n, rng):
+    """
+    Integers in [1, 100): the original analysis input. Heavily duplicated
+    once n approaches 100, which favours some algorithms over others.
+    """
+    return rng.integers(1, 100, n)
+
+def permutation_values(n, rng):
+    """A uniformly random permutation of 0..n-1: every key distinct."""
+    return rng.permutation(n).astype(np.int64)
+
+def random_values(n, rng):
+    """Uniform integers from a range wide enough that duplicates are rare."""
+    return rng.integers(0, 2 ** 31, n, dtype=np.int64)
+
+def sorted_values(n, rng):
+    return np.arange(n, dtype=np.int64)
+
+def reversed_values(n, rng):
+    return np.arange(n, 0, -1, dtype=np.int64)
+
+def few_unique_values(n, rng, unique=10):
+    """Uniform draws from `unique` distinct keys."""
+    return rng.integers(0, unique, n, dtype=np.int64)
+
+def nearly_sorted_values(n, rng, swaps=None):
+    """
+    Sorted input with `swaps` random pairs of positions exchanged (default:
+    1% of n, at least one). The pairs are disjoint, so all swaps are applied at once.
+    """
+    swaps = max(1, n // 100) if swaps is None else swaps
+    swaps = min(swaps, n // 2)
+    values = np.arange(n, dtype=np.int64)
+    positions = rng.choice(n, 2 * swaps, replace=False)
+    first, second = positions[:swaps], positions[swaps:]
+    values[first], values[second] = values[second], values[first]
+    return values
+
+def zipf_values(n, rng, exponent=1.5):
+    """Zipf-distributed keys: a few values repeat very often, most are rare."""
+    return rng.zipf(exponent, n).astype(np.int64)
+
+def sawtooth_values(n, rng):
+    """Ascending runs of about sqrt(n) elements each, repeated."""
+    tooth = max(2, math.isqrt(n))
+    return np.arange(n, dtype=np.int64) % tooth
+
+def median_of_3_killer_values(n, rng):
+    """
+    Musser's median-of-3 killer sequence, which drives a quick sort choosing the
+    median of the first, middle and last elements to quadratic time. For
+    n = 2k: 1, k+1, 3, k+3, ..., 2, 4, ..., 2k (e.g. 1 5 3 7 2 4 6 8).
+    """
+    k = n // 2
+    first_half = np.arange(1, k + 1, dtype=np.int64)
+    first_half[1::2] = first_half[0::2][:k // 2] + k
+    values = np.concatenate([first_half, np.arange(2, 2 * k + 1, 2, dtype=np.int64)])
+    if n % 2:
+        values = np.append(values, n)
+    return values
+
+def organ_pipe_values(n, rng):
+    """Ascending to the middle, then descending: 0 1 2 .. k .. 2 1 0."""
+    rising = np.arange((n + 1) // 2, dtype=np.int64)
+    return np.concatenate([rising, rising[:n // 2][::-1]])
+
+DISTRIBUTIONS = {
+    "small_range": small_range_values,
+    "permutation": permutation_values,
+    "random": random_values,
+    "sorted": sorted_values,
+    "reversed": reversed_values,
+    "few_unique": few_unique_values,
+    "organ_pipe": organ_pipe_values,
+    "nearly_sorted": nearly_sorted_values,
+    "zipf": zipf_values,
+    "sawtooth": sawtooth_values,
+    "median_of_3_killer": median_of_3_killer_values
+}
+
+# The distribution analysis has always used; results for it are unchanged.
+DEFAULT_DISTRIBUTION = "small_range"
+
+def draw_arrays(distribution, n, iterations, rng):
+    """
+    An (iterations x n) matrix of arrays from the named distribution, drawn one
+    row after another from `rng`.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown input distribution: {distribution}")
+    if distribution == "small_range":
+        # Same numbers as drawing the rows one by one, in a single call.
+        return rng.integers(1, 100, (iterations, n))
+    if iterations == 0:
+        return np.empty((0, n), dtype=np.int64)
+    return np.stack([DISTRIBUTIONS[distribution](n, rng) for _ in range(iterations)])
+
+def generate(distribution, n, seed=None):
+    """Draw an array of size n from the named distribution as a Python list."""
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown input distribution: {distribution}")
+    return DISTRIBUTIONS[distribution](n, np.random.default_rng(seed)).tolist()
@@ -0,0 +1,142 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+from decision_tree.comparison_tree import tree_statistics
+
+# Exact comparison counts of the registered algorithms on a uniformly random
+# permutation of n distinct keys: the expected count and its variance, and for
+# small n the whole distribution. Nothing here is sampled.
+
+# Input distribution the exact results describe (see analysis.distributions).
+EXACT_DISTRIBUTION = "permutation"
+
+# Default largest n whose distribution is found by enumerating all n! inputs.
+DEFAULT_EXACT_TREE_SIZE = 8
+
+
+def _harmonic(n, order=1):
+    return float(np.sum(1.0 / np.arange(1, n + 1, dtype=np.float64) ** order)) if n else 0.0
+
+
+@lru_cache(maxsize=None)
+def merge_moments(a, b):
+    """
+    Mean and variance of the comparisons made merging sorted runs of a and b
+    keys in random relative order. The merge stops when one run is used up,
+    so it costs a + b minus the tail L left in the other run, where
+    P(L >= t from the a-run) = C(a + b - t, b) / C(a + b, a).
+    """
+    if a == 0 or b == 0:
+        return 0.0, 0.0
+    mean_tail = square_tail = 0.0
+    for run, other in ((a, b), (b, a)):
+        t = np.arange(1, run + 1, dtype=np.float64)
+        at_least = np.cumprod((run - t + 1) / (run + other - t + 1))
+        mean_tail += at_least.sum()
+        square_tail += ((2 * t - 1) * at_least).sum()
+    return a + b - mean_tail, square_tail - mean_tail ** 2
+
+
+def quadratic_moments(n):
+    """bubble_sort and selection_sort always make n(n-1)/2 comparisons."""
+    return n * (n - 1) / 2, 0.0
+
+
+def insertion_sort_moments(n):
+    """
+    Key i (0-based) passes over X_i larger keys before it, X_i uniform on
+    0..i and independent of the other keys (the Lehmer code), and costs
+    X_i + 1 comparisons, or i if it reaches the front.
+    """
+    i = np.arange(1, n, dtype=np.float64)
+    mean = (i * (i + 1) / 2 + i) / (i + 1)
+    square = (i * (i + 1) * (2 * i + 1) / 6 + i ** 2) / (i + 1)
+    return float(mean.sum()), float((square - mean ** 2).sum())
+
+
+def quick_sort_moments(n):
+    """
+    Lomuto partitioning compares n - 1 keys with the pivot and leaves both
+    sides random, giving the classical 2(n+1)H_n - 4n and Knuth's variance
+    7n^2 - 4(n+1)^2 H_n^(2) - 2(n+1)H_n + 13n.
+    """
+    if n < 2:
+        return 0.0, 0.0
+    h1, h2 = _harmonic(n), _harmonic(n, 2)
+    mean = 2 * (n + 1) * h1 - 4 * n
+    variance = 7 * n * n - 4 * (n + 1) ** 2 * h2 - 2 * (n + 1) * h1 + 13 * n
+    return mean, max(variance, 0.0)
+
+
+@lru_cache(maxsize=None)
+def merge_sort_moments(n):
+    """
+    Top-down merge sort splits at n // 2. The interleaving of the two halves
+    is independent of their internal order, so the merges are independent.
+    """
+    if n < 2:
+        return 0.0, 0.0
+    left, right = n // 2, n - n // 2
+    moments = (merge_sort_moments(left), merge_sort_moments(right), merge_moments(left, right))
+    return sum(m[0] for m in moments), sum(m[1] for m in moments)
+
+
+def bottom_up_merge_sort_moments(n):
+    """
+    Passes merge runs of width 1, 2, 4, ...: each full pair of runs, plus a
+    shorter last pair, is an independent merge. (The in-place first pass
+    compares each pair once, like a merge of two single keys.)
+    """
+    mean = variance = 0.0
+    width = 1
+    while width < n:
+        pairs, rest = divmod(n, 2 * width)
+        m, v = merge_moments(width, width)
+        mean += pairs * m
+        variance += pairs * v
+        if rest > width:
+            m, v = merge_moments(width, rest - width)
+            mean += m
+            variance += v
+        width *= 2
+    return mean, variance
+
+
+MOMENT_FORMULAS = {
+    "bubble_sort": quadratic_moments,
+    "selection_sort": quadratic_moments,
+    "insertion_sort": insertion_sort_moments,
+    "merge_sort": merge_sort_moments,
+    "bottom_up_merge_sort": bottom_up_merge_sort_moments,
+    "quick_sort": quick_sort_moments
+}
+
+
+def exact_comparisons(algorithm, n, max_tree_size=DEFAULT_EXACT_TREE_SIZE):
+    """
+    Exact comparison statistics of a registered algorithm over all n!
+    orderings of n distinct keys, or None if they cannot be found cheaply.
+
+    For n <= max_tree_size they come from the comparison decision tree
+    (decision_tree.comparison_tree), which runs every permutation once with
+    identical subtrees shared; larger n use MOMENT_FORMULAS. Returns a
+    dictionary with mean, variance, method ("tree" or "formula") and, from
+    the tree only, distribution: the probability of each comparison count.
+    """
+    if n <= max_tree_size:
+        counts = np.array(tree_statistics(algorithm, n)["depth_distribution"], dtype=np.float64)
+        depths = np.arange(len(counts))
+        probabilities = counts / math.factorial(n)
+        mean = float((depths * probabilities).sum())
+        return {
+            "mean": mean,
+            "variance": float(((depths - mean) ** 2 * probabilities).sum()),
+            "method": "tree",
+            "distribution": probabilities.tolist()
+        }
+    formula = MOMENT_FORMULAS.get(algorithm)
+    if formula is None:
+        return None
+    mean, variance = formula(n)
+    return {"mean": float(mean), "variance": float(variance), "method": "formula", "distribution": None}
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis.average_case_analysis import DEFAULT_TEST_SIZES, run_analysis
+
+class JobQueueFull(Exception):
+    """Raised by AnalysisJobQueue.submit when max_pending jobs are already waiting or running."""
+
+
+class AnalysisJobQueue:
+    def __init__(self, concurrent_jobs=2, max_jobs=100, max_pending=20, **analysis_defaults):
+        """
+        Runs run_analysis in background threads and keeps per-job progress.
+
+        Parameters:
+        - concurrent_jobs: analyses that may run at the same time.
+        - max_jobs: jobs remembered; the oldest finished jobs are dropped first.
+        - max_pending: queued and running jobs allowed at once; submit() raises
+          JobQueueFull beyond it. A job with the same options as one still
+          pending is not queued again.
+        - analysis_defaults: keyword arguments passed to every run_analysis call
+          (e.g. max_workers for the process pool, cache).
+        """
+        self._executor = ThreadPoolExecutor(max_workers=concurrent_jobs)
+        self._jobs = OrderedDict()
+        self._pending = {}      # Options key -> id of the queued or running job
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+        self.analysis_defaults = analysis_defaults
+
+    def submit(self, **options):
+        """
+        Queue an analysis with run_analysis keyword `options` and return the
+        job id: that of the pending job with the same options if there is one.
+        Raises JobQueueFull if max_pending jobs are pending.
+        """
+        key = json.dumps(options, sort_keys=True, default=str)
+        job_id = uuid.uuid4().hex
+        test_sizes = options.get("test_sizes") or DEFAULT_TEST_SIZES
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "created": time.time(),
+            "total_sizes": len(test_sizes),
+            "partial_results": {},
+            "result": None,
+            "error": None,
+            "key": key
+        }
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+            if len(self._pending) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} analysis jobs are already pending")
+            self._pending[key] = job_id
+            self._jobs[job_id] = job
+            self._evict()
+        self._executor.submit(self._run, job, options)
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job's state, or None if the id is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            completed = len(job["partial_results"])
+            return {
+                "job_id": job_id,
+                "status": job["status"],
+                "progress": {
+                    "completed_sizes": completed,
+                    "total_sizes": job["total_sizes"],
+                    "fraction": completed / job["total_sizes"] if job["total_sizes"] else 1.0
+                },
+                "partial_results": dict(job["partial_results"]),
+                "result": job["result"],
+                "error": job["error"]
+            }
+
+    def _run(self, job, options):
+        def on_size_complete(n, algo_results):
+            with self._lock:
+                job["partial_results"][n] = algo_results
+
+        with self._lock:
+            job["status"] = "running"
+        try:
+            result = run_analysis(on_size_complete=on_size_complete,
+                                  **{**self.analysis_defaults, **options})
+        except Exception as exc:
+            with self._lock:
+                job["status"] = "failed"
+                job["error"] = str(exc)
+                del self._pending[job["key"]]
+            return
+        with self._lock:
+            job["result"] = result
+            job["status"] = "done"
+            del self._pending[job["key"]]
+
+    def _evict(self):
+        while len(self._jobs) > self.max_jobs:
+            finished = [k for k, j in self._jobs.items() if j["status"] in ("done", "failed")]
+            if not finished:
+                break
+            del self._jobs[finished[0]]
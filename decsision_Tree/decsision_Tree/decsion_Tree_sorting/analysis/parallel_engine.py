@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from analysis.sampling import chunk_seed, iteration_chunks, sample_counts
+from analysis.batch_comparisons import batch_comparison_counts, random_batch
+from analysis.adaptive_sampling import adaptive_counts
+from analysis.distributions import DEFAULT_DISTRIBUTION
+
+_executor = None
+_executor_workers = None
+
+def run_work_unit(algorithm, n, chunk, iterations, seed, distribution=DEFAULT_DISTRIBUTION):
+    """Process-pool entry point: one (algorithm, n, chunk) slice of the study."""
+    return sample_counts(SORTING_ALGORITHMS[algorithm], n, iterations, chunk_seed(seed, n, chunk),
+                         distribution)
+
+def run_batch_unit(algorithm, n, iterations, seed, distribution=DEFAULT_DISTRIBUTION):
+    """Process-pool entry point for batch mode: all iterations of one (algorithm, n) cell."""
+    return batch_comparison_counts(algorithm, random_batch(n, iterations, seed, distribution)).tolist()
+
+def run_adaptive_unit(algorithm, n, max_iterations, seed, tolerance, confidence, batch,
+                      distribution=DEFAULT_DISTRIBUTION):
+    """Process-pool entry point for adaptive mode: one (algorithm, n) cell."""
+    return adaptive_counts(algorithm, n, seed, max_iterations, tolerance, confidence, batch=batch,
+                           distribution=distribution)
+
+def get_executor(max_workers=None):
+    """Return a shared process pool, recreating it if the worker count changes."""
+    global _executor, _executor_workers
+    max_workers = max_workers or os.cpu_count() or 1
+    if _executor is None or _executor_workers != max_workers:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ProcessPoolExecutor(max_workers=max_workers)
+        _executor_workers = max_workers
+    return _executor
+
+def collect_comparison_counts(algorithms, test_sizes, iterations=100, seed=0, max_workers=None,
+                              cache=None, batch=False, tolerance=None, confidence=0.95,
+                              distribution=DEFAULT_DISTRIBUTION, on_size_complete=None):
+    """
+    Run every (algorithm, n) cell of the study and return
+    {(algorithm, n): [comparison counts]}.
+
+    Parameters:
+    - algorithms: registry names of the algorithms to run.
+    - test_sizes: list sizes to test.
+    - iterations: random arrays sorted per (algorithm, n); the upper limit
+      when `tolerance` is set.
+    - seed: base seed; the same seed always produces the same counts.
+    - max_workers: processes to use. 1 runs everything in the calling process;
+      None uses one process per CPU.
+    - cache: optional AnalysisCache; cached cells are not recomputed.
+    - batch: count each cell with the vectorised counters in
+      analysis.batch_comparisons. The arrays and counts are identical to the
+      scalar path, so both modes share cache entries.
+    - tolerance: if set, each cell stops sampling once the `confidence`
+      interval on its mean is within tolerance * mean (see
+      analysis.adaptive_sampling). Adaptive cells bypass the cache.
+    - distribution: input distribution from analysis.distributions.
+    - on_size_complete: see collect_cell_counts.
+    """
+    cells = [(algorithm, n) for n in test_sizes for algorithm in algorithms]
+    return collect_cell_counts(cells, iterations, seed, max_workers, cache, batch, tolerance,
+                               confidence, distribution, on_size_complete)
+
+def collect_cell_counts(cells, iterations=100, seed=0, max_workers=None, cache=None, batch=False,
+                        tolerance=None, confidence=0.95, distribution=DEFAULT_DISTRIBUTION,
+                        on_size_complete=None):
+    """
+    collect_comparison_counts for an explicit list of (algorithm, n) cells,
+    so that each size can run a different set of algorithms. The work units
+    of all sizes go to the process pool together; if given,
+    `on_size_complete(n, {algorithm: counts})` is called in the calling
+    thread as soon as every cell of size n is counted, so sizes may be
+    reported out of order.
+    """
+    cells = list(dict.fromkeys(cells))
+    counts = {}
+    if tolerance is not None:
+        cache = None
+    if cache is not None:
+        for algorithm, n in cells:
+            cached = cache.get(SORTING_ALGORITHMS[algorithm], n, iterations, seed, distribution)
+            if cached is not None:
+                counts[(algorithm, n)] = cached
+
+    pending = [cell for cell in cells if cell not in counts]
+    if tolerance is not None:
+        runner = run_adaptive_unit
+        units = [
+            (algorithm, n, iterations, seed, tolerance, confidence, batch, distribution)
+            for algorithm, n in pending
+        ]
+    elif batch:
+        runner = run_batch_unit
+        units = [(algorithm, n, iterations, seed, distribution) for algorithm, n in pending]
+    else:
+        runner = run_work_unit
+        units = [
+            (algorithm, n, chunk, chunk_iterations, seed, distribution)
+            for algorithm, n in pending
+            for chunk, chunk_iterations in iteration_chunks(iterations)
+        ]
+
+    results = [None] * len(units)
+    size_units = {}
+    for k, (_, n, *_) in enumerate(units):
+        size_units.setdefault(n, []).append(k)
+    remaining = {n: len(indices) for n, indices in size_units.items()}
+
+    def finish_size(n):
+        computed = {}
+        for k in size_units.get(n, ()):
+            computed.setdefault((units[k][0], n), []).extend(results[k])
+        if cache is not None:
+            for (algorithm, _), cell_counts in computed.items():
+                cache.put(SORTING_ALGORITHMS[algorithm], n, iterations, seed, cell_counts, distribution)
+        counts.update(computed)
+        if on_size_complete is not None:
+            on_size_complete(n, {algorithm: counts[(algorithm, size)] for algorithm, size in cells
+                                 if size == n})
+
+    def finish_unit(k, unit_counts):
+        results[k] = unit_counts
+        n = units[k][1]
+        remaining[n] -= 1
+        if remaining[n] == 0:
+            finish_size(n)
+
+    for n in dict.fromkeys(n for _, n in cells):
+        if n not in size_units:
+            finish_size(n)
+    if max_workers == 1 or len(units) <= 1:
+        for k, unit in enumerate(units):
+            finish_unit(k, runner(*unit))
+    elif units:
+        executor = get_executor(max_workers)
+        # Submit the largest inputs first so the slowest units are not left
+        # running on a single core at the end.
+        order = sorted(range(len(units)), key=lambda k: units[k][1], reverse=True)
+        futures = {executor.submit(runner, *units[k]): k for k in order}
+        for future in as_completed(futures):
+            finish_unit(futures[future], future.result())
+    return counts
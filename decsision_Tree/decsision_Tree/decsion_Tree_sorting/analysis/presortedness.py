@@ -0,0 +1,112 @@
+import math
+from bisect import bisect_right
+
+import numpy as np
+from analysis.batch_comparisons import count_inversions
+from sorting_algorithms.hybrid_sort import INSERTION_CUTOFF, MIN_AVERAGE_RUN
+
+# Measures of how far an input already is from sorted, all in O(n log n) or
+# better, and a dispatcher that uses them to predict which registered
+# algorithm needs the fewest comparisons on it.
+
+def inversions(arr):
+    """Number of pairs i < j with arr[i] > arr[j] (merge-based, O(n log n))."""
+    matrix = np.asarray(arr).reshape(1, -1)
+    return int(count_inversions(matrix)[0])
+
+def run_lengths(arr):
+    """
+    Lengths of the natural runs of arr, split as timsort and hybrid_sort do:
+    each run is a maximal non-descending or strictly descending stretch.
+    """
+    n = len(arr)
+    lengths = []
+    i = 0
+    while i < n:
+        j = i + 1
+        if j < n and arr[j] < arr[i]:
+            while j + 1 < n and arr[j + 1] < arr[j]:
+                j += 1
+        else:
+            while j < n and not arr[j] < arr[j - 1]:
+                j += 1
+            j -= 1
+        lengths.append(j - i + 1)
+        i = j + 1
+    return lengths
+
+def longest_increasing_subsequence(arr):
+    """
+    Length of the longest non-decreasing subsequence, by patience sorting.
+    len(arr) minus this is the number of elements that must move to sort arr.
+    """
+    tails = []
+    for value in arr:
+        k = bisect_right(tails, value)
+        if k == len(tails):
+            tails.append(value)
+        else:
+            tails[k] = value
+    return len(tails)
+
+def entropy(counts):
+    """Shannon entropy, in bits, of the distribution given by `counts`."""
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+    p = counts[counts > 0] / total
+    return float(max(0.0, -(p * np.log2(p)).sum()))
+
+def presortedness(arr):
+    """
+    Presortedness metrics of arr:
+      - inversions: pairs out of order; insertion sort makes about n - 1 + inversions comparisons.
+      - runs: natural runs (see run_lengths).
+      - run_entropy: entropy of the run lengths; merging the runs needs about
+        n * run_entropy comparisons.
+      - longest_increasing_subsequence: see longest_increasing_subsequence.
+      - entropy: entropy of the key frequencies; low when keys repeat a lot.
+    """
+    lengths = run_lengths(arr)
+    _, frequencies = np.unique(np.asarray(arr), return_counts=True)
+    return {
+        "n": len(arr),
+        "inversions": inversions(arr),
+        "runs": len(lengths),
+        "run_entropy": entropy(lengths),
+        "longest_increasing_subsequence": longest_increasing_subsequence(arr),
+        "entropy": entropy(frequencies)
+    }
+
+def estimate_comparisons(metrics):
+    """
+    Predicted comparison counts, from presortedness(arr), for the algorithms the
+    dispatcher chooses between.
+    """
+    n = metrics["n"]
+    insertion = max(n - 1, 0) + metrics["inversions"]
+    n_log_n = n * math.log2(n) if n > 1 else 0.0
+    if n <= INSERTION_CUTOFF:
+        hybrid = insertion
+    elif metrics["runs"] <= max(1, n // MIN_AVERAGE_RUN):
+        # Run detection scans the input once, then the runs are merged.
+        hybrid = (n - 1) + n * metrics["run_entropy"]
+    else:
+        hybrid = n_log_n
+    return {
+        "insertion_sort": insertion,
+        "hybrid_sort": hybrid,
+        "merge_sort": max(n_log_n - n, 0.0)
+    }
+
+def choose_algorithm(arr, metrics=None):
+    """
+    Name of the registered algorithm predicted to sort arr with the fewest
+    comparisons: insertion sort for nearly sorted input, hybrid sort when it
+    has a few long runs, merge sort otherwise. Ties go to the simpler algorithm.
+    """
+    if metrics is None:
+        metrics = presortedness(arr)
+    estimates = estimate_comparisons(metrics)
+    return min(estimates, key=estimates.get)
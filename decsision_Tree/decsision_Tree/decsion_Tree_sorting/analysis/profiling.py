@@ -0,0 +1,56 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Algorithms compared by run_analysis(profile=...) when asked for "merge".
+MERGE_SORT_VARIANTS = ("merge_sort", "bottom_up_merge_sort", "galloping_merge_sort")
+
+# tracemalloc is process-wide: measurements from different threads (e.g. two
+# analysis jobs) take turns so that one never stops or resets the peak of
+# another.
+_tracing_lock = threading.Lock()
+
+@contextmanager
+def tracing():
+    """
+    Run the block with tracemalloc on, holding the process-wide measurement
+    lock. tracemalloc is started only if it was off, and then stopped again;
+    use tracemalloc.reset_peak() between measurements inside the block.
+    """
+    with _tracing_lock:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            yield
+        finally:
+            if started:
+                tracemalloc.stop()
+
+def profile_sort(sort_func, arrays):
+    """
+    Time and memory of sorting a copy of each array in `arrays`.
+    Returns a dictionary with:
+      - seconds_per_sort: mean wall time, measured without tracemalloc.
+      - peak_bytes: the largest peak of memory allocated by a single sort
+        beyond its input copy, measured in a second pass with tracemalloc.
+    """
+    arrays = [list(arr) for arr in arrays]
+    start = time.perf_counter()
+    for arr in arrays:
+        sort_func(list(arr))
+    seconds = time.perf_counter() - start
+
+    peak_bytes = 0
+    with tracing():
+        for arr in arrays:
+            data = list(arr)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            sort_func(data)
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - baseline)
+    return {
+        "seconds_per_sort": seconds / len(arrays) if arrays else 0.0,
+        "peak_bytes": peak_bytes
+    }
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import types
+from collections import OrderedDict
+
+from analysis.distributions import DEFAULT_DISTRIBUTION
+
+def code_fingerprint(func):
+    """
+    Hash of a function's bytecode, constants and referenced names, including any
+    nested functions and the module-level functions it calls by name. Editing
+    the algorithm changes the fingerprint, so results cached for the old version
+    are no longer returned.
+    """
+    digest = hashlib.sha256()
+    seen = set()
+
+    def feed(code, namespace):
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode())
+        for const in code.co_consts:
+            if hasattr(const, "co_code"):
+                feed(const, namespace)
+            else:
+                digest.update(repr(const).encode())
+        for name in code.co_names:
+            target = namespace.get(name)
+            if isinstance(target, types.FunctionType) and target.__code__ not in seen:
+                seen.add(target.__code__)
+                feed(target.__code__, target.__globals__)
+
+    seen.add(func.__code__)
+    feed(func.__code__, func.__globals__)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    def __init__(self, path=None, max_entries=1024):
+        """
+        Two-tier cache of comparison counts keyed by
+        (algorithm, n, iterations, seed, input distribution, bytecode fingerprint).
+
+        Parameters:
+        - path: SQLite file for the on-disk tier, or None for memory only.
+          The database is opened lazily on first use.
+        - max_entries: size of the in-process LRU tier.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._fingerprints = {}
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self.path is None:
+            return None
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(comparison_counts)")]
+            if columns and "distribution" not in columns:
+                # Written before results were keyed by distribution; it is only a cache.
+                self._connection.execute("DROP TABLE comparison_counts")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS comparison_counts ("
+                " algorithm TEXT, n INTEGER, iterations INTEGER, seed INTEGER,"
+                " distribution TEXT, fingerprint TEXT, counts TEXT,"
+                " PRIMARY KEY (algorithm, n, iterations, seed, distribution, fingerprint))"
+            )
+            self._connection.commit()
+        return self._connection
+
+    def _key(self, sort_func, n, iterations, seed, distribution):
+        fingerprint = self._fingerprints.get(sort_func)
+        if fingerprint is None:
+            fingerprint = self._fingerprints[sort_func] = code_fingerprint(sort_func)
+        return (sort_func.__name__, n, iterations, seed, distribution, fingerprint)
+
+    def get(self, sort_func, n, iterations, seed, distribution=DEFAULT_DISTRIBUTION):
+        """Return the cached list of comparison counts, or None on a miss."""
+        key = self._key(sort_func, n, iterations, seed, distribution)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            db = self._db()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT counts FROM comparison_counts WHERE algorithm = ? AND n = ?"
+                " AND iterations = ? AND seed = ? AND distribution = ? AND fingerprint = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            counts = json.loads(row[0])
+            self._remember(key, counts)
+            return counts
+
+    def put(self, sort_func, n, iterations, seed, counts, distribution=DEFAULT_DISTRIBUTION):
+        key = self._key(sort_func, n, iterations, seed, distribution)
+        counts = [int(c) for c in counts]
+        with self._lock:
+            self._remember(key, counts)
+            db = self._db()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO comparison_counts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    key + (json.dumps(counts),)
+                )
+                db.commit()
+
+    def invalidate(self, algorithm=None):
+        """Drop cached results for one algorithm name, or everything if None."""
+        with self._lock:
+            for key in [k for k in self._memory if algorithm is None or k[0] == algorithm]:
+                del self._memory[key]
+            db = self._db()
+            if db is not None:
+                if algorithm is None:
+                    db.execute("DELETE FROM comparison_counts")
+                else:
+                    db.execute("DELETE FROM comparison_counts WHERE algorithm = ?", (algorithm,))
+                db.commit()
+
+    def _remember(self, key, counts):
+        self._memory[key] = counts
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+class ResponseCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        In-process LRU cache of responses, bounded by their total size rather
+        than their number. Entries larger than max_bytes are not kept.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """Cache `value`, counted as `size` bytes (default: len(value))."""
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, oldest) = self._entries.popitem(last=False)
+                self.nbytes -= oldest
+
+    def discard(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
@@ -0,0 +1,30 @@
+import numpy as np
+from analysis.distributions import DEFAULT_DISTRIBUTION, draw_arrays
+
+# Iterations are split into chunks of this size. Each chunk draws its arrays
+# from its own seed, so results depend only on (seed, n, chunk) and not on how
+# many workers ran them or in which order.
+CHUNK_SIZE = 25
+
+def chunk_seed(seed, n, chunk):
+    """Deterministic seed for one chunk of iterations at size n."""
+    return np.random.SeedSequence([seed, n, chunk])
+
+def iteration_chunks(iterations, chunk_size=CHUNK_SIZE):
+    """Yield (chunk_index, chunk_iterations) pairs covering `iterations`."""
+    for chunk, start in enumerate(range(0, iterations, chunk_size)):
+        yield chunk, min(chunk_size, iterations - start)
+
+def draw_chunk(n, iterations, seed_sequence, distribution=DEFAULT_DISTRIBUTION):
+    """The (iterations x n) matrix of arrays that sample_counts sorts for this seed."""
+    return draw_arrays(distribution, n, iterations, np.random.default_rng(seed_sequence))
+
+def sample_counts(sort_func, n, iterations, seed_sequence, distribution=DEFAULT_DISTRIBUTION):
+    """
+    Sort `iterations` arrays of size n from the named input distribution, drawn
+    from `seed_sequence`, and return the list of comparison counts.
+    """
+    return [
+        sort_func(row, track_comparisons=True)
+        for row in draw_chunk(n, iterations, seed_sequence, distribution).tolist()
+    ]
@@ -1,80 +1,439 @@
-from flask import Flask, render_template, request, jsonify
+import io
+import json
+import os
+
+from flask import Flask, Response, render_template, request, jsonify
 import numpy as np
 
 # Import decision tree generator and analysis module.
-from decision_tree.tree_generator import build_decision_tree
+from decision_tree.tree_generator import build_tree_store, get_traced_sort, tree_to_table
+from decision_tree.trace import TRACE_MIMETYPE, stream_sort
+from decision_tree.trace_store import TraceStore
 from analysis.average_case_analysis import run_analysis
+from analysis.result_cache import AnalysisCache, ResponseCache
+from analysis.jobs import AnalysisJobQueue, JobQueueFull
+from analysis.profiling import MERGE_SORT_VARIANTS
+from analysis.distributions import DEFAULT_DISTRIBUTION, DISTRIBUTIONS, generate as generate_input
+from analysis.presortedness import choose_algorithm, presortedness
+from analysis.batch_sort import sort_arrays, sort_matrix
+from sorting_algorithms.registry import get_sort_function
 
 app = Flask(__name__)
 
+# Worker processes used by /api/analysis (defaults to one per CPU).
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", os.cpu_count() or 1))
+
+# Seed used by /api/analysis when none is given, so repeat loads hit the cache.
+DEFAULT_ANALYSIS_SEED = 0
+
+# Upper limits on ?iterations= and on each of ?sizes= for /api/analysis. The
+# quadratic sorts make n(n-1)/2 comparisons per array, all in Python; with
+# ?batch=1 most algorithms are counted by the vectorised counters instead (20
+# arrays of 10000 keys take about 8 s on one core), so larger sizes are allowed.
+MAX_ANALYSIS_ITERATIONS = 100000
+MAX_ANALYSIS_SIZE = 5000
+MAX_BATCH_ANALYSIS_SIZE = 20000
+# Decision trees enumerate tree_size! inputs per algorithm: building them for
+# every registered algorithm takes about 2 s at 7, but over 15 s at 8.
+MAX_ANALYSIS_TREE_SIZE = 7
+
+# Comparison counts cached in memory and in instance/analysis_cache.sqlite3.
+analysis_cache = AnalysisCache(os.path.join(app.instance_path, "analysis_cache.sqlite3"))
+
+# Background analyses started through /api/analysis/jobs.
+analysis_jobs = AnalysisJobQueue(
+    concurrent_jobs=int(os.environ.get("ANALYSIS_JOB_WORKERS", 2)),
+    max_workers=ANALYSIS_WORKERS,
+    cache=analysis_cache
+)
+
+# Largest list_size accepted by /api/run_sort and its variants, as in the UI.
+MAX_LIST_SIZE = 5000
+
+# Largest trace (in operations) returned inline in the /api/run_sort response.
+MAX_INLINE_TRACE_OPERATIONS = 200000
+
+# Traces of /api/run_sort runs, replayed through /api/trace/<id>, in
+# instance/traces: at most TRACE_STORE_BYTES on disk in all, and none over
+# MAX_STORED_TRACE_BYTES (a bubble sort of 5000 keys encodes to about 225 MB).
+trace_store = TraceStore(
+    os.path.join(app.instance_path, "traces"),
+    max_bytes=int(os.environ.get("TRACE_STORE_BYTES", 1024 * 1024 * 1024)),
+    max_trace_bytes=int(os.environ.get("MAX_STORED_TRACE_BYTES", 16 * 1024 * 1024))
+)
+
+# Responses of seeded /api/run_sort requests, bounded by their total size.
+run_sort_cache = ResponseCache(int(os.environ.get("RUN_SORT_CACHE_BYTES", 64 * 1024 * 1024)))
+
+# Largest ?count= for a window of /api/trace/<id> operations.
+MAX_TRACE_WINDOW = 10000
+
+# Largest number of elements, over all arrays, accepted by /api/sort/batch, and
+# the lower limit that applies when comparison counts are requested (these may
+# have to run the Python implementations row by row).
+MAX_BATCH_ELEMENTS = 10000000
+MAX_BATCH_COUNTED_ELEMENTS = 200000
+
+# MIME types under which /api/sort/batch reads and writes .npy data.
+NPY_MIMETYPES = ("application/x-npy", "application/octet-stream")
+
+# Algorithm name that lets /api/run_sort pick the algorithm for the input
+# (see analysis.presortedness.choose_algorithm).
+AUTO_ALGORITHM = "auto"
+
 # Route to serve the front-end HTML
 @app.route("/")
 def home():
     return render_template("index.html")
 
-# For demonstration, we implement a bubble sort that logs operations.
-def bubble_sort_with_log(arr):
-    operations_log = []
-    n = len(arr)
-    for i in range(n):
-        for j in range(0, n - i - 1):
-            op_compare = {
-                "type": "compare",
-                "indices": (j, j + 1),
-                "values": (arr[j], arr[j + 1]),
-                "list_state": arr.copy()
-            }
-            operations_log.append(op_compare)
-            if arr[j] > arr[j + 1]:
-                op_swap = {
-                    "type": "swap",
-                    "indices": (j, j + 1),
-                    "values": (arr[j], arr[j + 1]),
-                    "list_state": arr.copy()
-                }
-                operations_log.append(op_swap)
-                arr[j], arr[j + 1] = arr[j + 1], arr[j]
-    return arr, operations_log
-
-def tree_to_dict(node):
-    if node is None:
-        return None
-    return {
-        "operation": node.operation,
-        "state": node.state,
-        "children": [tree_to_dict(child) for child in node.children]
-    }
+def request_seed(data):
+    """The seed of a /api/run_sort request, or None; raises ValueError if invalid."""
+    seed = data.get("seed")
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("seed must be a non-negative integer")
+    return seed
+
+def draw_input(data, list_size):
+    """
+    The array to sort for a /api/run_sort request: list_size integers in
+    [1, 100) by default, or a draw from data["distribution"] (any name in
+    analysis.distributions.DISTRIBUTIONS). The draw uses a local generator
+    seeded with data["seed"] when given, so equal requests sort equal arrays.
+    Raises ValueError for invalid sizes, unknown distributions and invalid seeds.
+    """
+    if isinstance(list_size, bool) or not isinstance(list_size, int) or not 0 <= list_size <= MAX_LIST_SIZE:
+        raise ValueError(f"list_size must be an integer between 0 and {MAX_LIST_SIZE}")
+    distribution = data.get("distribution") or DEFAULT_DISTRIBUTION
+    if not isinstance(distribution, str) or distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown input distribution: {distribution}")
+    return generate_input(distribution, list_size, seed=request_seed(data))
+
+def read_sort_request(req):
+    """
+    The JSON body, algorithm name and input array of a /api/run_sort request
+    (or of its stream and binary variants). Raises ValueError for a body that
+    is not a JSON object, unknown algorithms and invalid draw_input options.
+    """
+    data = req.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object body")
+    algorithm = data.get("algorithm", "bubble_sort")
+    if algorithm != AUTO_ALGORITHM and (not isinstance(algorithm, str) or get_traced_sort(algorithm) is None):
+        raise ValueError(f"Unknown sorting algorithm: {algorithm}")
+    return data, algorithm, draw_input(data, data.get("list_size", 10))
 
 @app.route('/api/run_sort', methods=['POST'])
 def run_sort():
-    data = request.get_json()
-    algorithm = data.get("algorithm", "bubble_sort")
-    list_size = data.get("list_size", 10)
-    
-    if algorithm != "bubble_sort":
-        return jsonify({"error": "Currently only bubble_sort is implemented with logging"}), 400
-    
-    arr = np.random.randint(1, 100, list_size).tolist()
-    sorted_arr, operations_log = bubble_sort_with_log(arr.copy())
+    """
+    Sort one array and return it with its trace, metrics and (for small
+    inputs) decision tree. Requests with a seed are deterministic, so their
+    responses are cached by (algorithm, list_size, seed, distribution); the
+    X-Cache header tells whether the response came from the cache.
+    trace_id is None when the trace is too large to store for replay.
+    """
+    try:
+        data, algorithm, arr = read_sort_request(request)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    list_size = len(arr)
+
+    cache_key = None
+    if data.get("seed") is not None:
+        cache_key = (algorithm, list_size, data["seed"], data.get("distribution") or DEFAULT_DISTRIBUTION)
+        cached = run_sort_cache.get(cache_key)
+        # The stored trace may have been pruned since; then sort again.
+        if cached is not None and (cached[1] is None or cached[1] in trace_store):
+            return Response(cached[0], mimetype="application/json", headers={"X-Cache": "hit"})
+    metrics = presortedness(arr)
+    if algorithm == AUTO_ALGORITHM:
+        algorithm = choose_algorithm(arr, metrics)
+    sorted_arr, trace = get_traced_sort(algorithm)(arr, compact=True)
     decision_tree = None
+    operations_log = "Log omitted for large input"
     if list_size <= 4:
-        tree_root = build_decision_tree(operations_log)
-        decision_tree = tree_to_dict(tree_root)
+        operations_log = trace.to_log()
+        decision_tree = tree_to_table(build_tree_store(trace).root)
     
     response = {
         "algorithm": algorithm,
         "original_array": arr,
         "sorted_array": sorted_arr,
-        "comparisons": len([op for op in operations_log if op["type"] == "compare"]),
-        "operations_log": operations_log if list_size <= 4 else "Log omitted for large input",
+        "comparisons": trace.count("compare"),
+        "presortedness": metrics,
+        "operations_log": operations_log,
+        "trace": trace.to_dict() if len(trace) <= MAX_INLINE_TRACE_OPERATIONS else "Trace omitted for large input",
+        "trace_id": trace_store.put(trace),
         "decision_tree": decision_tree if list_size <= 4 else "Decision tree not generated for large input"
     }
-    return jsonify(response)
+    result = jsonify(response)
+    if cache_key is not None:
+        body = result.get_data()
+        run_sort_cache.put(cache_key, (body, response["trace_id"]), len(body))
+    result.headers["X-Cache"] = "miss"
+    return result
+
+@app.route('/api/run_sort/stream', methods=['POST'])
+def run_sort_stream():
+    """
+    Streaming variant of /api/run_sort. Responds with newline-delimited JSON: a
+    "start" line with the original array, one line per operation while the sort
+    runs (with the positions it writes instead of the full list state), and a
+    final "end" line with the sorted array and totals.
+    """
+    try:
+        _, algorithm, arr = read_sort_request(request)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if algorithm == AUTO_ALGORITHM:
+        algorithm = choose_algorithm(arr)
+    sort_with_log = get_traced_sort(algorithm)
+
+    def generate():
+        yield json.dumps({"type": "start", "algorithm": algorithm, "original_array": arr}) + "\n"
+        for op in stream_sort(sort_with_log, arr):
+            yield json.dumps(op) + "\n"
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route('/api/run_sort/binary', methods=['POST'])
+def run_sort_binary():
+    """
+    Variant of /api/run_sort that returns only the trace, in the columnar
+    binary format of CompactTrace.to_bytes(). The original array, sorted array
+    and totals can all be rebuilt from it; the algorithm used is given in the
+    X-Sort-Algorithm header.
+    """
+    try:
+        _, algorithm, arr = read_sort_request(request)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if algorithm == AUTO_ALGORITHM:
+        algorithm = choose_algorithm(arr)
+    _, trace = get_traced_sort(algorithm)(arr, compact=True)
+    return Response(trace.to_bytes(), mimetype=TRACE_MIMETYPE,
+                    headers={"X-Sort-Algorithm": algorithm})
+
+@app.route('/api/trace/<trace_id>', methods=['GET'])
+def trace_window(trace_id):
+    """
+    Operations ?from= (default 0) to from + ?count= (default and limit
+    MAX_TRACE_WINDOW) of a stored trace, each with the positions it writes.
+    Use /api/trace/<id>/state/<k> for the list before a window.
+    """
+    packed = trace_store.get(trace_id)
+    if packed is None:
+        return jsonify({"error": f"Unknown trace: {trace_id}"}), 404
+    try:
+        start = int(request.args.get("from", 0))
+        count = int(request.args.get("count", MAX_TRACE_WINDOW))
+    except ValueError:
+        return jsonify({"error": "from and count must be integers"}), 400
+    if start < 0 or not 0 <= count <= MAX_TRACE_WINDOW:
+        return jsonify({"error": f"from must be >= 0 and count between 0 and {MAX_TRACE_WINDOW}"}), 400
+    return jsonify({
+        "trace_id": trace_id,
+        "total": len(packed),
+        "from": start,
+        "operations": packed.operations(start, start + count)
+    })
+
+@app.route('/api/trace/<trace_id>/state/<int:step>', methods=['GET'])
+def trace_state(trace_id, step):
+    """The list after the first `step` operations of a stored trace."""
+    packed = trace_store.get(trace_id)
+    if packed is None:
+        return jsonify({"error": f"Unknown trace: {trace_id}"}), 404
+    if step > len(packed):
+        return jsonify({"error": f"Step out of range: the trace has {len(packed)} operations"}), 400
+    return jsonify({"trace_id": trace_id, "step": step, "state": packed.state(step)})
+
+def parse_analysis_options(args):
+    """
+    Read run_analysis keyword arguments from query parameters:
+    sizes (comma-separated), iterations, seed, batch, tolerance, confidence,
+    tree_size, profile (comma-separated algorithm names, or "merge" for the
+    merge sort variants) and distribution.
+    Raises ValueError with a user-facing message on invalid input.
+    """
+    try:
+        seed = int(args.get("seed", DEFAULT_ANALYSIS_SEED))
+    except ValueError:
+        seed = -1
+    if seed < 0:
+        raise ValueError("seed must be a non-negative integer")
+    options = {
+        "seed": seed,
+        "batch": str(args.get("batch", "0")).lower() in ("1", "true")
+    }
+    if "sizes" in args:
+        try:
+            sizes = [int(size) for size in args["sizes"].split(",") if size.strip()]
+        except ValueError:
+            raise ValueError("sizes must be a comma-separated list of integers")
+        max_size = MAX_BATCH_ANALYSIS_SIZE if options["batch"] else MAX_ANALYSIS_SIZE
+        if not sizes or any(not 1 <= size <= max_size for size in sizes):
+            raise ValueError(f"sizes must be integers between 1 and {max_size}")
+        options["test_sizes"] = sizes
+    iterations = args.get("iterations", 100, type=int)
+    if not 1 <= iterations <= MAX_ANALYSIS_ITERATIONS:
+        raise ValueError(f"iterations must be between 1 and {MAX_ANALYSIS_ITERATIONS}")
+    options["iterations"] = iterations
+    if "tolerance" in args:
+        tolerance = args.get("tolerance", type=float)
+        if tolerance is None or tolerance <= 0:
+            raise ValueError("tolerance must be a positive number")
+        options["tolerance"] = tolerance
+    confidence = args.get("confidence", 0.95, type=float)
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    options["confidence"] = confidence
+    if "tree_size" in args:
+        tree_size = args.get("tree_size", type=int)
+        if tree_size is None or not 0 <= tree_size <= MAX_ANALYSIS_TREE_SIZE:
+            raise ValueError(f"tree_size must be between 0 and {MAX_ANALYSIS_TREE_SIZE}")
+        options["tree_size"] = tree_size
+    if args.get("profile"):
+        if args["profile"] == "merge":
+            profile = list(MERGE_SORT_VARIANTS)
+        else:
+            profile = [name.strip() for name in args["profile"].split(",") if name.strip()]
+        unknown = [name for name in profile if get_sort_function(name) is None]
+        if unknown:
+            raise ValueError(f"Unknown sorting algorithm: {', '.join(unknown)}")
+        options["profile"] = profile
+    if "distribution" in args:
+        if args["distribution"] not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown input distribution: {args['distribution']}")
+        options["distribution"] = args["distribution"]
+    return options
 
 @app.route('/api/analysis', methods=['GET'])
 def analysis():
-    analysis_results = run_analysis()
+    try:
+        options = parse_analysis_options(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    analysis_results = run_analysis(max_workers=ANALYSIS_WORKERS, cache=analysis_cache, **options)
     return jsonify(analysis_results)
 
+@app.route('/api/analysis/jobs', methods=['POST'])
+def submit_analysis_job():
+    """
+    Start an analysis in the background. Accepts the same parameters as
+    /api/analysis, as query parameters or in a JSON body, and returns a job id
+    (that of an identical job still pending, if any). Answers 429 when
+    analysis_jobs.max_pending jobs are already pending.
+    """
+    args = request.args.copy()
+    for key, value in (request.get_json(silent=True) or {}).items():
+        args[key] = ",".join(str(v) for v in value) if isinstance(value, list) else str(value)
+    try:
+        options = parse_analysis_options(args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    try:
+        job_id = analysis_jobs.submit(**options)
+    except JobQueueFull as exc:
+        return jsonify({"error": str(exc)}), 429
+    return jsonify({"job_id": job_id, "status_url": f"/api/analysis/jobs/{job_id}"}), 202
+
+@app.route('/api/analysis/jobs/<job_id>', methods=['GET'])
+def analysis_job_status(job_id):
+    """Progress, per-size results finished so far, and the final payload when done."""
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
+
+@app.route('/api/analysis/cache', methods=['DELETE'])
+def invalidate_analysis_cache():
+    """Drop cached analysis results, optionally for a single ?algorithm=."""
+    algorithm = request.args.get("algorithm")
+    analysis_cache.invalidate(algorithm)
+    return jsonify({"invalidated": algorithm or "all"})
+
+def read_batch(req):
+    """
+    The arrays and options of a /api/sort/batch request: a 2-D numeric array
+    for a .npy body, or a list of 1-D numeric arrays for a JSON one. Options
+    come from the JSON body or, for .npy, the query string.
+    Raises ValueError for malformed or oversized input.
+    """
+    if req.mimetype in NPY_MIMETYPES:
+        try:
+            arrays = np.load(io.BytesIO(req.get_data()), allow_pickle=False)
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"Invalid .npy body: {exc}")
+        if arrays.ndim == 1:
+            arrays = arrays.reshape(1, -1)
+        if arrays.ndim != 2:
+            raise ValueError(".npy body must hold a 1-D or 2-D array")
+        options, rows = req.args, arrays
+    else:
+        options = req.get_json(silent=True)
+        if not isinstance(options, dict) or not isinstance(options.get("arrays"), list):
+            raise ValueError('Expected a JSON body with an "arrays" list, or a .npy body')
+        message = "Each array must be a flat list of numbers"
+        try:
+            arrays = [np.asarray(arr) for arr in options["arrays"]]
+        except ValueError:
+            raise ValueError(message)
+        if any(arr.ndim != 1 for arr in arrays):
+            raise ValueError(message)
+        rows = arrays
+    for arr in rows:
+        if arr.size == 0:
+            continue
+        if not (np.issubdtype(arr.dtype, np.integer) or np.issubdtype(arr.dtype, np.floating)):
+            raise ValueError("Arrays must contain only integers or real numbers")
+        if np.issubdtype(arr.dtype, np.floating) and not np.isfinite(arr).all():
+            raise ValueError("Arrays must not contain NaN or infinite values")
+
+    algorithm = options.get("algorithm")
+    if algorithm is not None and get_sort_function(algorithm) is None:
+        raise ValueError(f"Unknown sorting algorithm: {algorithm}")
+    return_order = str(options.get("order", "")).lower() in ("1", "true")
+    elements = sum(arr.size for arr in rows)
+    limit = MAX_BATCH_ELEMENTS if algorithm is None else MAX_BATCH_COUNTED_ELEMENTS
+    if elements > limit:
+        raise ValueError(f"Batch too large: {elements} elements (limit {limit})")
+    return arrays, algorithm, return_order
+
+@app.route('/api/sort/batch', methods=['POST'])
+def sort_batch():
+    """
+    Sort many arrays in one request. The body is either JSON,
+    {"arrays": [[...], ...], "algorithm": name, "order": true}, or a .npy
+    file (Content-Type application/x-npy) holding one array per row, with
+    algorithm and order as query parameters.
+
+    The arrays are sorted by numpy, a whole matrix at a time. Only when an
+    algorithm is named are its comparison counts computed, which may run the
+    Python implementations. The response lists the sorted arrays, plus
+    "order" (argsort of each array) and "comparisons" when asked for; with
+    ?format=npy and a .npy body it is the sorted matrix as .npy instead.
+    """
+    try:
+        arrays, algorithm, return_order = read_batch(request)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if isinstance(arrays, np.ndarray):
+        result = sort_matrix(arrays, algorithm, return_order)
+        if request.args.get("format") == "npy":
+            buffer = io.BytesIO()
+            np.save(buffer, result["sorted"], allow_pickle=False)
+            return Response(buffer.getvalue(), mimetype=NPY_MIMETYPES[0])
+    else:
+        result = sort_arrays(arrays, algorithm, return_order)
+
+    response = {"count": len(arrays), "sorted": [row.tolist() for row in result["sorted"]]}
+    if result["order"] is not None:
+        response["order"] = [row.tolist() for row in result["order"]]
+    if result["comparisons"] is not None:
+        response["algorithm"] = algorithm
+        response["comparisons"] = [int(count) for count in result["comparisons"]]
+    return jsonify(response)
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,187 @@
+import itertools
+import math
+from array import array
+from functools import lru_cache
+
+import numpy as np
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from analysis.bounds import average_case_lower_bound, worst_case_lower_bound
+
+# Largest n for which the full comparison tree is enumerated (n! runs). For
+# all registered algorithms together, n = 8 takes about 12 s and n = 9 about
+# 150 s and 120 MB; n = 10 would take ten times longer still.
+MAX_TREE_SIZE = 9
+
+# Node id reserved for the (shared) leaf.
+LEAF = 0
+
+
+class _ComparisonRecorder:
+    """Tracer that keeps only the comparisons of a run as (indices, a < b)."""
+    __slots__ = ("comparisons",)
+
+    def __init__(self):
+        self.comparisons = []
+
+    def record(self, op_type, indices, values, writes=()):
+        if op_type == "compare":
+            self.comparisons.append((indices, values[0] < values[1]))
+
+
+def _comparisons(sort_func, perm):
+    recorder = _ComparisonRecorder()
+    sort_func(list(perm), tracer=recorder)
+    return recorder.comparisons
+
+
+class ComparisonDAG:
+    def __init__(self, algorithm, n):
+        """
+        The exact comparison decision tree of a sorting algorithm for inputs of
+        size n, stored as a DAG in which identical subtrees are shared.
+
+        Every permutation of range(n) is sorted once to find its path: the
+        comparison outcomes, and the compared indices as small codes. The paths
+        are ordered as they appear in the tree, and the tree is then rebuilt
+        from them path by path, without sorting again, closing each subtree as
+        soon as no later path can enter it. A closed subtree is hash-consed on
+        (indices, lt_child, gt_child), so only the DAG is ever held in memory.
+
+        Internal nodes are labelled by the indices the algorithm compared; the
+        'lt' branch is taken when the first compared value is the smaller one.
+        Branches that no permutation takes (redundant comparisons) are None.
+        """
+        if n > MAX_TREE_SIZE:
+            raise ValueError(f"Full decision trees are limited to n <= {MAX_TREE_SIZE}")
+        self.algorithm = algorithm
+        self.n = n
+        sort_func = SORTING_ALGORITHMS[algorithm]
+
+        # Node tables, indexed by node id. Node 0 is the leaf.
+        self.indices = [None]
+        self.children = [(None, None)]
+        self.leaves = [1]           # Leaves below the node
+        self.depth_sum = [0]        # Sum of leaf depths, relative to the node
+        self.max_depth = [0]
+        self.min_depth = [0]
+        self.tree_size = [1]        # Nodes in the equivalent unshared tree
+        self._intern = {}
+
+        # Pass 1: the outcome bits and index codes of every permutation's path.
+        total = math.factorial(n)
+        bits = np.zeros(total, dtype=np.uint64)
+        lengths = np.zeros(total, dtype=np.int64)
+        index_codes = {}            # Compared indices -> code
+        paths = [None] * total      # Index codes along each path
+        for rank, perm in enumerate(itertools.permutations(range(n))):
+            path = 0
+            comparisons = _comparisons(sort_func, perm)
+            for _, outcome in comparisons:
+                path = (path << 1) | outcome
+            if len(comparisons) > 64:
+                raise ValueError("Paths longer than 64 comparisons are not supported")
+            bits[rank] = path
+            lengths[rank] = len(comparisons)
+            paths[rank] = array("H", [index_codes.setdefault(indices, len(index_codes))
+                                      for indices, _ in comparisons])
+        indices_of = list(index_codes)
+        width = int(lengths.max()) if total else 0
+        # Paths are prefix-free, so left-aligning them makes numeric order
+        # equal to the order of the leaves in the tree.
+        aligned = bits << (width - lengths).astype(np.uint64)
+        order = np.argsort(aligned, kind="stable")
+
+        # Pass 2: replay the paths in tree order, keeping only the open path.
+        stack = []                  # [indices, lt_child, gt_child] per depth
+        self._outcomes = []         # Outcomes of the path the stack follows
+        self.root = LEAF
+        previous = None
+        for rank in order.tolist():
+            key = int(aligned[rank])
+            codes = paths[rank]
+            # Depth of the node where this path leaves the previous one.
+            diverge = -1 if previous is None else width - (key ^ previous).bit_length()
+            self._close(stack, diverge + 1)
+            for code in codes[len(stack):]:
+                stack.append([indices_of[code], None, None])
+            path, length = int(bits[rank]), len(codes)
+            self._outcomes = [(path >> (length - 1 - depth)) & 1 for depth in range(length)]
+            if codes:
+                stack[-1][2 - self._outcomes[-1]] = LEAF
+            previous = key
+        self._close(stack, 0)
+
+    def _close(self, stack, keep):
+        """Hash-cons and pop the open nodes deeper than `keep`."""
+        while len(stack) > keep:
+            indices, lt_child, gt_child = stack.pop()
+            node = self._intern_node(indices, lt_child, gt_child)
+            if stack:
+                stack[-1][2 - self._outcomes[len(stack) - 1]] = node
+            else:
+                self.root = node
+
+    def _intern_node(self, indices, lt_child, gt_child):
+        key = (indices, lt_child, gt_child)
+        node = self._intern.get(key)
+        if node is not None:
+            return node
+        present = [c for c in (lt_child, gt_child) if c is not None]
+        node = len(self.indices)
+        self.indices.append(indices)
+        self.children.append((lt_child, gt_child))
+        self.leaves.append(sum(self.leaves[c] for c in present))
+        self.depth_sum.append(sum(self.depth_sum[c] + self.leaves[c] for c in present))
+        self.max_depth.append(1 + max(self.max_depth[c] for c in present))
+        self.min_depth.append(1 + min(self.min_depth[c] for c in present))
+        self.tree_size.append(1 + sum(self.tree_size[c] for c in present))
+        self._intern[key] = node
+        return node
+
+    def depth_distribution(self):
+        """
+        Number of inputs (leaves) at each depth: entry d counts the
+        permutations on which the algorithm makes exactly d comparisons.
+        """
+        # Children are interned before their parents, so node ids are in
+        # topological order and each histogram is built from finished ones.
+        histograms = [np.ones(1, dtype=np.int64)]
+        for node in range(1, len(self.indices)):
+            histogram = np.zeros(self.max_depth[node] + 1, dtype=np.int64)
+            for child in self.children[node]:
+                if child is not None:
+                    below = histograms[child]
+                    histogram[1:len(below) + 1] += below
+            histograms.append(histogram)
+        return histograms[self.root].tolist()
+
+    def statistics(self):
+        """Depth statistics over all n! inputs, plus tree and DAG sizes."""
+        root = self.root
+        leaves = self.leaves[root]
+        return {
+            "depth_distribution": self.depth_distribution(),
+            "n": self.n,
+            "leaves": leaves,
+            "average_depth": self.depth_sum[root] / leaves,
+            "max_depth": self.max_depth[root],
+            "min_depth": self.min_depth[root],
+            "tree_nodes": self.tree_size[root],
+            "dag_nodes": len(self.indices),
+            "information_theoretic_minimum": int(worst_case_lower_bound(self.n)),
+            "average_case_minimum": float(average_case_lower_bound(self.n))
+        }
+
+    def to_table(self):
+        """Flat node table: one entry per DAG node, children given by id."""
+        return [
+            {"id": node, "indices": self.indices[node],
+             "lt": self.children[node][0], "gt": self.children[node][1]}
+            for node in range(len(self.indices))
+        ]
+
+
+@lru_cache(maxsize=64)
+def tree_statistics(algorithm, n):
+    """Memoised ComparisonDAG(algorithm, n).statistics()."""
+    return ComparisonDAG(algorithm, n).statistics()
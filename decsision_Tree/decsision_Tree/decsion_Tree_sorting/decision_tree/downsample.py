@@ -0,0 +1,68 @@
+import heapq
+import random
+
+# Relative chance of an operation type being kept when there are more
+# operations than the node budget allows. Types not listed get weight 1;
+# weight 0 drops a type entirely.
+DEFAULT_OPERATION_PRIORITIES = {
+    "swap": 4.0,
+    "insert": 4.0,
+    "merge": 3.0,
+    "shift": 2.0,
+    "compare": 1.0
+}
+
+
+class OperationSampler:
+    def __init__(self, budget, priorities=None, seed=None):
+        """
+        One-pass downsampler for a stream of sorting operations.
+
+        Keeps at most `budget` operations using weighted reservoir sampling
+        (each operation draws the key u ** (1 / priority) and the largest keys
+        win), so memory stays O(budget) however long the stream is.
+        Operations that change the list are kept in their own reservoir and
+        always take precedence: they are all retained while they fit in the
+        budget, and comparisons only fill the slots left over.
+
+        Parameters:
+        - budget: maximum number of operations to keep.
+        - priorities: dict of operation type -> weight (see
+          DEFAULT_OPERATION_PRIORITIES).
+        - seed: seed for the sampler's random numbers.
+        """
+        self.budget = budget
+        self.priorities = DEFAULT_OPERATION_PRIORITIES if priorities is None else priorities
+        self._random = random.Random(seed)
+        self._state_changes = []    # Min-heaps of (key, step, item)
+        self._others = []
+        self.offered = 0
+
+    def offer(self, step, op_type, changes_state, make_item):
+        """
+        Consider the operation at `step`. `make_item` is called (with no
+        arguments) only if the operation enters a reservoir, so expensive
+        items such as state copies are built only for candidates.
+        Returns True if the operation was taken into a reservoir.
+        """
+        self.offered += 1
+        weight = self.priorities.get(op_type, 1.0)
+        if weight <= 0 or self.budget <= 0:
+            return False
+        key = self._random.random() ** (1.0 / weight)
+        heap = self._state_changes if changes_state else self._others
+        if len(heap) < self.budget:
+            heapq.heappush(heap, (key, step, make_item()))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, step, make_item()))
+        else:
+            return False
+        return True
+
+    def result(self):
+        """The kept items, in the order their operations were offered."""
+        kept = list(self._state_changes)
+        spare = self.budget - len(kept)
+        if spare > 0:
+            kept.extend(heapq.nlargest(spare, self._others))
+        return [item for _, _, item in sorted(kept, key=lambda entry: entry[1])]
@@ -0,0 +1,46 @@
+MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """SplitMix64 finaliser: spreads the bits of x over a 64-bit key."""
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class ZobristHash:
+    def __init__(self, state, seed=0):
+        """
+        Rolling Zobrist hash of a list.
+
+        Every (position, value) pair gets a pseudo-random 64-bit key, and the hash of
+        the list is the XOR of the keys of its entries. Writing a new value to a
+        position only XORs out the old key and XORs in the new one, so keeping
+        the hash current costs O(1) per write instead of O(n) per state.
+
+        Parameters:
+        - state: the initial list; a copy is kept and updated by apply().
+        - seed: selects the key table; equal lists hash equally for equal seeds.
+        """
+        self.state = list(state)
+        self._keys = {}
+        self.seed = seed
+        self.value = 0
+        for index, value in enumerate(self.state):
+            self.value ^= self._key(index, value)
+
+    def _key(self, index, value):
+        key = self._keys.get((index, value))
+        if key is None:
+            key = self._keys[(index, value)] = _mix64(hash((self.seed, index, value)) & MASK64)
+        return key
+
+    def apply(self, writes):
+        """Apply (index, new_value) pairs to the state and update the hash."""
+        for index, value in writes:
+            old = self.state[index]
+            if old != value:
+                self.value ^= self._key(index, old) ^ self._key(index, value)
+                self.state[index] = value
+        return self.value
@@ -0,0 +1,612 @@
+import queue
+import struct
+import threading
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+DEFAULT_CHECKPOINT_INTERVAL = 64
+
+# Binary trace format (CompactTrace.to_bytes), little-endian throughout:
+#   header   magic "CTRC", version u8, op type count u8, 2 bytes padding, then
+#            u32 checkpoint interval, state length, operation count, index
+#            count, value count and write count
+#   types    per op type: u8 length + UTF-8 name; padded to 8 bytes
+#   columns  in COLUMN_ORDER, each an 8-byte header (u8 dtype code, padding)
+#            followed by the packed values, padded to 8 bytes
+# Every column uses the narrowest of COLUMN_DTYPES that holds its values, and
+# starts 8-byte aligned so a browser can view it as a typed array in place.
+TRACE_MAGIC = b"CTRC"
+TRACE_FORMAT_VERSION = 1
+TRACE_MIMETYPE = "application/octet-stream"
+COLUMN_DTYPES = {1: "<u1", 2: "<i1", 3: "<i2", 4: "<i4", 5: "<f8", 6: "<i8"}
+COLUMN_ORDER = (
+    "initial_state", "op_code", "index_count", "value_count", "write_count",
+    "indices", "values", "write_index", "write_value"
+)
+_HEADER = struct.Struct("<4sBBxxIIIIII")
+
+
+def _pad(size):
+    return -size % 8
+
+
+def _pack_column(values):
+    """Dtype code and bytes of a column, in the narrowest dtype that holds it."""
+    column = np.asarray(values)
+    if column.size == 0:
+        column = column.astype(np.uint8)
+    if np.issubdtype(column.dtype, np.integer) or np.issubdtype(column.dtype, np.bool_):
+        low, high = (int(column.min()), int(column.max())) if column.size else (0, 0)
+        for code in (1, 2, 3, 4, 6):
+            info = np.iinfo(COLUMN_DTYPES[code])
+            if info.min <= low and high <= info.max:
+                break
+    else:
+        code = 5
+    data = column.astype(COLUMN_DTYPES[code]).tobytes()
+    return bytes([code]) + bytes(7) + data + bytes(_pad(len(data)))
+
+
+def _read_binary(data):
+    """Operation type names, checkpoint interval and numpy columns of a binary trace."""
+    (magic, version, type_count, interval, state_length, operation_count,
+     index_count, value_count, write_count) = _HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_FORMAT_VERSION:
+        raise ValueError("Not a binary trace in a supported version")
+    offset = _HEADER.size
+    types = []
+    for _ in range(type_count):
+        length = data[offset]
+        types.append(data[offset + 1:offset + 1 + length].decode())
+        offset += 1 + length
+    offset += _pad(offset)
+
+    counts = {
+        "initial_state": state_length, "op_code": operation_count,
+        "index_count": operation_count, "value_count": operation_count,
+        "write_count": operation_count, "indices": index_count,
+        "values": value_count, "write_index": write_count, "write_value": write_count
+    }
+    columns = {}
+    for name in COLUMN_ORDER:
+        columns[name], offset = _unpack_column(data, offset, counts[name])
+    return types, interval, columns
+
+
+def _unpack_column(buffer, offset, count):
+    code = buffer[offset]
+    dtype = np.dtype(COLUMN_DTYPES[code])
+    offset += 8
+    column = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    offset += count * dtype.itemsize
+    return column, offset + _pad(count * dtype.itemsize)
+
+
+# Typecodes CompactTrace stores its operation columns in, from the narrowest;
+# a column moves to the next one when a value does not fit, and to a list
+# once none does (for floats, or integers beyond 64 bits).
+_WIDER_TYPECODES = {"B": "HIQ", "H": "IQ", "I": "Q", "Q": "", "b": "hiq", "h": "iq", "i": "q", "q": ""}
+_OPERATION_COLUMNS = {
+    "op_code": "B", "index_count": "B", "value_count": "B", "write_count": "B",
+    "indices": "b", "values": "b", "write_index": "b", "write_value": "b"
+}
+
+# Operations decoded at a time by CompactTrace._decode.
+_DECODE_BLOCK = 4096
+
+# Count column giving the number of items each operation adds to a column.
+_ITEM_COUNTS = {
+    "indices": "index_count", "values": "value_count",
+    "write_index": "write_count", "write_value": "write_count"
+}
+
+
+def _extend(columns, name, items):
+    """Append `items` to columns[name], widening the column if they do not fit."""
+    column = columns[name]
+    size = len(column)
+    try:
+        column.extend(items)
+        return
+    except (OverflowError, TypeError):
+        del column[size:]
+    for typecode in _WIDER_TYPECODES[column.typecode]:
+        try:
+            wider = array(typecode, column)
+            wider.extend(items)
+        except (OverflowError, TypeError):
+            continue
+        columns[name] = wider
+        return
+    columns[name] = column.tolist() + list(items)
+
+
+class CompactTrace:
+    def __init__(self, initial_state, checkpoint_interval=None):
+        """
+        Delta-encoded operation log for a single sorting run.
+
+        Instead of storing a full copy of the list with every operation, each
+        entry only records the positions it wrote to. A full copy of the list
+        is kept every `checkpoint_interval` operations so that the state at any
+        step can be rebuilt by replaying at most that many entries.
+
+        Operations are held in the columns of the binary format (see
+        COLUMN_ORDER), as typed arrays in the narrowest type that fits, so an
+        operation costs about a dozen bytes rather than a few hundred for a
+        tuple of tuples. `operations` gives a read-only sequence of
+        (type, indices, values, writes) tuples over them.
+
+        Parameters:
+        - initial_state: the list before the first operation.
+        - checkpoint_interval: number of operations between checkpoints. Defaults
+          to max(DEFAULT_CHECKPOINT_INTERVAL, len(initial_state)), which keeps the
+          checkpoints at O(total operations) memory.
+        """
+        self.initial_state = list(initial_state)
+        self.checkpoint_interval = checkpoint_interval or max(
+            DEFAULT_CHECKPOINT_INTERVAL, len(self.initial_state)
+        )
+        self.columns = {name: array(typecode) for name, typecode in _OPERATION_COLUMNS.items()}
+        self.types = []         # Operation type names, by op_code
+        self._codes = {}
+        self.checkpoints = [list(self.initial_state)]  # State before operation k * interval
+        self._offsets = [(0, 0, 0)]  # Index, value and write offsets of operation k * interval
+        self._current = list(self.initial_state)
+
+    def record(self, op_type, indices, values, writes=()):
+        """
+        Append an operation to the trace.
+
+        Parameters:
+        - op_type: type of operation (e.g., "compare", "swap", "shift", "merge", "insert").
+        - indices: tuple of indices involved.
+        - values: the values involved in the operation.
+        - writes: sequence of (index, new_value) pairs applied by this operation.
+        """
+        columns = self.columns
+        steps = len(columns["op_code"])
+        if steps and steps % self.checkpoint_interval == 0:
+            self.checkpoints.append(list(self._current))
+            self._offsets.append((len(columns["indices"]), len(columns["values"]),
+                                  len(columns["write_index"])))
+        code = self._codes.get(op_type)
+        if code is None:
+            code = self._codes[op_type] = len(self.types)
+            self.types.append(op_type)
+        indices, values = tuple(indices), tuple(values)
+        write_index = []
+        write_value = []
+        for index, value in writes:
+            self._current[index] = value
+            write_index.append(index)
+            write_value.append(value)
+        try:
+            columns["indices"].extend(indices)
+            columns["values"].extend(values)
+            columns["write_index"].extend(write_index)
+            columns["write_value"].extend(write_value)
+            columns["index_count"].append(len(indices))
+            columns["value_count"].append(len(values))
+            columns["write_count"].append(len(write_index))
+            columns["op_code"].append(code)
+        except (OverflowError, TypeError):
+            # Something does not fit its column: undo this operation's partial
+            # append, then append it again widening the columns that need it.
+            for name in ("index_count", "value_count", "write_count", "op_code"):
+                del columns[name][steps:]
+            for name, count in _ITEM_COUNTS.items():
+                del columns[name][sum(columns[count]):]
+            entry = {
+                "indices": indices, "values": values, "write_index": write_index,
+                "write_value": write_value, "index_count": (len(indices),),
+                "value_count": (len(values),), "write_count": (len(write_index),), "op_code": (code,)
+            }
+            for name, items in entry.items():
+                _extend(columns, name, items)
+
+    def __len__(self):
+        return len(self.columns["op_code"])
+
+    def __getitem__(self, step):
+        """Return the operation at `step` in the legacy dictionary format."""
+        if step < 0:
+            step += len(self)
+        if not 0 <= step < len(self):
+            raise IndexError("trace index out of range")
+        return self._as_dict(self.operations[step], self.state_at(step))
+
+    def __iter__(self):
+        return self.iter_log()
+
+    @property
+    def operations(self):
+        """Read-only sequence of the (type, indices, values, writes) tuples."""
+        return TraceOperations(self)
+
+    @property
+    def final_state(self):
+        return list(self._current)
+
+    def count(self, op_type):
+        """Number of recorded operations of the given type."""
+        code = self._codes.get(op_type)
+        return 0 if code is None else self.columns["op_code"].count(code)
+
+    def op_type(self, step):
+        """Type name of the operation at `step`."""
+        return self.types[self.columns["op_code"][step]]
+
+    def iter_operations(self, start=0, stop=None):
+        """Yield the (type, indices, values, writes) tuples of operations start..stop-1."""
+        types = self.types
+        for code, indices, values, write_index, write_value in self._decode(start, stop):
+            yield types[code], tuple(indices), tuple(values), tuple(zip(write_index, write_value))
+
+    def _decode(self, start=0, stop=None):
+        """
+        Yield (op_code, indices, values, write_index, write_value) for operations
+        start..stop-1, as lists, decoding the columns a block at a time.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(start, 0)
+        if start >= stop:
+            return
+        columns = self.columns
+        index_counts, value_counts = columns["index_count"], columns["value_count"]
+        write_counts = columns["write_count"]
+        checkpoint = start // self.checkpoint_interval
+        first = checkpoint * self.checkpoint_interval
+        i, v, w = self._offsets[checkpoint]
+        i += sum(index_counts[first:start])
+        v += sum(value_counts[first:start])
+        w += sum(write_counts[first:start])
+        for block in range(start, stop, _DECODE_BLOCK):
+            end = min(block + _DECODE_BLOCK, stop)
+            codes = columns["op_code"][block:end].tolist()
+            index_count = index_counts[block:end].tolist()
+            value_count = value_counts[block:end].tolist()
+            write_count = write_counts[block:end].tolist()
+            i_end, v_end = i + sum(index_count), v + sum(value_count)
+            w_end = w + sum(write_count)
+            indices = list(columns["indices"][i:i_end])
+            values = list(columns["values"][v:v_end])
+            write_index = list(columns["write_index"][w:w_end])
+            write_value = list(columns["write_value"][w:w_end])
+            a = b = c = 0
+            for k in range(end - block):
+                a_end, b_end, c_end = a + index_count[k], b + value_count[k], c + write_count[k]
+                yield (codes[k], indices[a:a_end], values[b:b_end],
+                       write_index[c:c_end], write_value[c:c_end])
+                a, b, c = a_end, b_end, c_end
+            i, v, w = i_end, v_end, w_end
+
+    def state_at(self, step):
+        """
+        Rebuild the list state after the operation at index `step` has been applied.
+        A step of -1 returns the initial state.
+        """
+        applied = step + 1
+        if not 0 <= applied <= len(self):
+            raise IndexError("trace step out of range")
+        checkpoint = min(applied // self.checkpoint_interval, len(self.checkpoints) - 1)
+        state = list(self.checkpoints[checkpoint])
+        lo = self._offsets[checkpoint][2]
+        hi = lo + sum(self.columns["write_count"][checkpoint * self.checkpoint_interval:applied])
+        for index, value in zip(self.columns["write_index"][lo:hi], self.columns["write_value"][lo:hi]):
+            state[index] = value
+        return state
+
+    def iter_log(self, start=0, stop=None):
+        """
+        Yield operations in the legacy format (with a full 'list_state' copy),
+        materialising one entry at a time.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        state = self.state_at(start - 1)
+        for op in self.iter_operations(start, stop):
+            for index, value in op[3]:
+                state[index] = value
+            yield self._as_dict(op, list(state))
+
+    def to_log(self):
+        """Expand the trace into the legacy list of operation dictionaries."""
+        return list(self.iter_log())
+
+    def to_dict(self):
+        """JSON-serialisable representation; checkpoints are rebuilt on load."""
+        return {
+            "initial_state": self.initial_state,
+            "checkpoint_interval": self.checkpoint_interval,
+            "operations": [
+                [self.types[code], indices, values, [[index, value] for index, value in zip(write_index, write_value)]]
+                for code, indices, values, write_index, write_value in self._decode()
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        trace = cls(data["initial_state"], data.get("checkpoint_interval"))
+        for op_type, indices, values, writes in data["operations"]:
+            trace.record(op_type, indices, values, writes)
+        return trace
+
+    def to_bytes(self):
+        """
+        Columnar binary encoding of the trace (see TRACE_MAGIC above), several
+        times smaller than to_dict() as JSON.
+        """
+        types = self.types
+        columns = dict(self.columns, initial_state=self.initial_state)
+        if len(types) > 255:
+            raise ValueError("Traces with more than 255 operation types cannot be encoded")
+
+        names = b"".join(bytes([len(name.encode())]) + name.encode() for name in types)
+        parts = [
+            _HEADER.pack(TRACE_MAGIC, TRACE_FORMAT_VERSION, len(types), self.checkpoint_interval,
+                         len(self.initial_state), len(self), len(columns["indices"]),
+                         len(columns["values"]), len(columns["write_index"])),
+            names, bytes(_pad(_HEADER.size + len(names)))
+        ]
+        parts.extend(_pack_column(columns[name]) for name in COLUMN_ORDER)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Decode a trace written by to_bytes()."""
+        types, interval, columns = _read_binary(bytes(data))
+        columns = {name: column.tolist() for name, column in columns.items()}
+        trace = cls(columns["initial_state"], interval)
+        index_pos = value_pos = write_pos = 0
+        for k, code in enumerate(columns["op_code"]):
+            indices = columns["indices"][index_pos:index_pos + columns["index_count"][k]]
+            values = columns["values"][value_pos:value_pos + columns["value_count"][k]]
+            writes = zip(columns["write_index"][write_pos:write_pos + columns["write_count"][k]],
+                         columns["write_value"][write_pos:write_pos + columns["write_count"][k]])
+            trace.record(types[code], indices, values, writes)
+            index_pos += columns["index_count"][k]
+            value_pos += columns["value_count"][k]
+            write_pos += columns["write_count"][k]
+        return trace
+
+    @classmethod
+    def from_log(cls, operations_log, initial_state=None, checkpoint_interval=None):
+        """
+        Convert a legacy operations log into a compact trace by diffing the
+        'list_state' of consecutive entries.
+        """
+        if initial_state is None:
+            initial_state = operations_log[0]["list_state"] if operations_log else []
+        trace = cls(initial_state, checkpoint_interval)
+        previous = trace.initial_state
+        for op in operations_log:
+            state = op["list_state"]
+            writes = [(k, v) for k, (old, v) in enumerate(zip(previous, state)) if old != v]
+            trace.record(op["type"], op["indices"], op["values"], writes)
+            previous = state
+        return trace
+
+    @staticmethod
+    def _as_dict(op, list_state):
+        op_type, indices, values, _ = op
+        return {
+            "type": op_type,
+            "indices": indices,
+            "values": values,
+            "list_state": list_state
+        }
+
+
+class TraceOperations(Sequence):
+    """Read-only sequence view of a CompactTrace's operations as tuples."""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __len__(self):
+        return len(self.trace)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, stride = item.indices(len(self))
+            if stride != 1:
+                return [self[k] for k in range(start, stop, stride)]
+            return list(self.trace.iter_operations(start, stop))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("trace index out of range")
+        return next(self.trace.iter_operations(item, item + 1))
+
+    def __iter__(self):
+        return self.trace.iter_operations()
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+def _starts(counts):
+    """Offset of each entry's first item in a column of variable-length entries."""
+    starts = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=starts[1:])
+    return starts
+
+
+def _apply_writes(state, indices, values):
+    """Apply writes to a numpy state in order, so the last write to an index wins."""
+    if len(indices):
+        positions, last = np.unique(indices[::-1], return_index=True)
+        state[positions] = values[::-1][last]
+
+
+class PackedTrace:
+    def __init__(self, data):
+        """
+        Read-only, random-access view of a trace encoded by CompactTrace.to_bytes().
+
+        The columns stay as numpy arrays over the encoded bytes, and a copy of
+        the list state is built once every `checkpoint_interval` operations.
+        A window of operations then costs O(window) and the state at any step
+        O(checkpoint_interval + n), however long the trace.
+        """
+        self.data = bytes(data)
+        self.types, self.checkpoint_interval, self.columns = _read_binary(self.data)
+        columns = self.columns
+        self._index_starts = _starts(columns["index_count"])
+        self._value_starts = _starts(columns["value_count"])
+        self._write_starts = _starts(columns["write_count"])
+
+        dtype = np.result_type(columns["initial_state"], columns["write_value"])
+        state = columns["initial_state"].astype(dtype)
+        self.checkpoints = [state.copy()]  # State before operation k * interval
+        for start in range(self.checkpoint_interval, len(self) + 1, self.checkpoint_interval):
+            lo = self._write_starts[start - self.checkpoint_interval]
+            hi = self._write_starts[start]
+            _apply_writes(state, columns["write_index"][lo:hi], columns["write_value"][lo:hi])
+            self.checkpoints.append(state.copy())
+
+    def __len__(self):
+        return len(self.columns["op_code"])
+
+    def state(self, step):
+        """The list after the first `step` operations (0 is the initial state)."""
+        if not 0 <= step <= len(self):
+            raise IndexError("trace step out of range")
+        checkpoint = step // self.checkpoint_interval
+        state = self.checkpoints[checkpoint].copy()
+        lo = self._write_starts[checkpoint * self.checkpoint_interval]
+        hi = self._write_starts[step]
+        _apply_writes(state, self.columns["write_index"][lo:hi], self.columns["write_value"][lo:hi])
+        return state.tolist()
+
+    def operations(self, start=0, stop=None):
+        """
+        Operations start..stop-1 as dictionaries with keys 'type', 'indices',
+        'values' and 'writes' (the (index, new_value) pairs applied), as
+        streamed by stream_sort.
+        """
+        stop = len(self) if stop is None else min(stop, len(self))
+        start = max(start, 0)
+        if start >= stop:
+            return []
+        columns = self.columns
+
+        def window(name, starts):
+            return columns[name][starts[start]:starts[stop]].tolist()
+
+        codes = columns["op_code"][start:stop].tolist()
+        index_counts = columns["index_count"][start:stop].tolist()
+        value_counts = columns["value_count"][start:stop].tolist()
+        write_counts = columns["write_count"][start:stop].tolist()
+        indices = window("indices", self._index_starts)
+        values = window("values", self._value_starts)
+        write_index = window("write_index", self._write_starts)
+        write_value = window("write_value", self._write_starts)
+
+        result = []
+        i = v = w = 0
+        for code, index_count, value_count, write_count in zip(codes, index_counts,
+                                                               value_counts, write_counts):
+            result.append({
+                "type": self.types[code],
+                "indices": indices[i:i + index_count],
+                "values": values[v:v + value_count],
+                "writes": [[index, value] for index, value in
+                           zip(write_index[w:w + write_count], write_value[w:w + write_count])]
+            })
+            i += index_count
+            v += value_count
+            w += write_count
+        return result
+
+
+class TraceStreamClosed(Exception):
+    """Raised inside a sorting run when the consumer of its stream has gone away."""
+
+
+class StreamingTrace:
+    def __init__(self, max_pending=1024):
+        """
+        Trace sink that hands operations to a consumer as they are recorded.
+
+        Recording blocks once `max_pending` operations are waiting, so a slow
+        consumer throttles the sort instead of letting memory grow.
+        """
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = threading.Event()
+        self.operation_count = 0
+        self.comparisons = 0
+
+    def record(self, op_type, indices, values, writes=()):
+        entry = {
+            "type": op_type,
+            "indices": list(indices),
+            "values": list(values),
+            "writes": [[index, value] for index, value in writes]
+        }
+        self.operation_count += 1
+        if op_type == "compare":
+            self.comparisons += 1
+        self._put(entry)
+
+    def _put(self, item):
+        while True:
+            if self._closed.is_set():
+                raise TraceStreamClosed()
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_sort(sort_func, arr, max_pending=1024):
+    """
+    Run `sort_func` (one of the *_with_log functions) in a background thread and
+    yield its operations one at a time while it runs.
+
+    Yields operation dictionaries with keys 'type', 'indices', 'values' and
+    'writes' (the (index, new_value) pairs applied by the operation), followed by
+    a final {"type": "end", ...} entry carrying the sorted list and totals.
+    """
+    sink = StreamingTrace(max_pending)
+    done = object()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["sorted"], _ = sort_func(arr, compact=True, trace=sink)
+        except TraceStreamClosed:
+            return
+        except Exception as exc:  # Re-raised in the consuming thread
+            outcome["error"] = exc
+        try:
+            sink._put(done)
+        except TraceStreamClosed:
+            pass
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = sink._queue.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        sink._closed.set()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    yield {
+        "type": "end",
+        "sorted_array": outcome["sorted"],
+        "comparisons": sink.comparisons,
+        "operations": sink.operation_count
+    }
@@ -0,0 +1,119 @@
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+from decision_tree.trace import PackedTrace
+
+_TRACE_ID = re.compile(r"[0-9a-f]{32}")
+
+
+class TraceStore:
+    def __init__(self, directory=None, max_cached=16, max_stored=1000,
+                 max_bytes=1024 * 1024 * 1024, max_trace_bytes=16 * 1024 * 1024):
+        """
+        Sort traces kept under an id, for replaying and seeking through them.
+
+        Parameters:
+        - directory: where each trace is written, in the binary format of
+          CompactTrace.to_bytes(), as <id>.trace; None keeps traces in memory
+          only. The directory is created on first use.
+        - max_cached: PackedTrace views held in memory (least recently used
+          dropped first).
+        - max_stored: trace files kept on disk; the oldest are deleted first.
+        - max_bytes: total size of the trace files kept on disk; the oldest are
+          deleted first once it is exceeded.
+        - max_trace_bytes: largest encoded trace that is stored at all; put()
+          refuses bigger ones.
+        """
+        self.directory = directory
+        self.max_cached = max_cached
+        self.max_stored = max_stored
+        self.max_bytes = max_bytes
+        self.max_trace_bytes = max_trace_bytes
+        self.nbytes = 0         # Size of the files in _stored
+        self._cache = OrderedDict()
+        self._stored = None     # Id -> file size on disk, oldest first; read on first put
+        self._lock = threading.Lock()
+
+    def put(self, trace):
+        """
+        Store a CompactTrace and return its id, or None if its encoding is
+        larger than max_trace_bytes and it was not stored.
+        """
+        data = trace.to_bytes()
+        if len(data) > self.max_trace_bytes:
+            return None
+        trace_id = uuid.uuid4().hex
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(trace_id)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            self._prune(trace_id, len(data))
+        self._remember(trace_id, PackedTrace(data))
+        return trace_id
+
+    def get(self, trace_id):
+        """The PackedTrace stored under `trace_id`, or None if it is unknown."""
+        if not _TRACE_ID.fullmatch(trace_id):
+            return None
+        with self._lock:
+            packed = self._cache.get(trace_id)
+            if packed is not None:
+                self._cache.move_to_end(trace_id)
+                return packed
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(trace_id), "rb") as f:
+                packed = PackedTrace(f.read())
+        except FileNotFoundError:
+            return None
+        self._remember(trace_id, packed)
+        return packed
+
+    def __contains__(self, trace_id):
+        """Whether get(trace_id) would find the trace, without loading it."""
+        if not _TRACE_ID.fullmatch(trace_id):
+            return False
+        with self._lock:
+            if trace_id in self._cache:
+                return True
+        return self.directory is not None and os.path.exists(self._path(trace_id))
+
+    def _path(self, trace_id):
+        return os.path.join(self.directory, trace_id + ".trace")
+
+    def _remember(self, trace_id, packed):
+        with self._lock:
+            self._cache[trace_id] = packed
+            self._cache.move_to_end(trace_id)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+    def _prune(self, trace_id, size):
+        with self._lock:
+            if self._stored is None:
+                entries = [entry for entry in os.scandir(self.directory)
+                           if entry.name.endswith(".trace")]
+                entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+                self._stored = OrderedDict(
+                    (entry.name[:-len(".trace")], entry.stat().st_size) for entry in entries
+                )
+                self.nbytes = sum(self._stored.values())
+            self._stored[trace_id] = size
+            self.nbytes += size
+            expired = []
+            while len(self._stored) > 1 and (len(self._stored) > self.max_stored
+                                             or self.nbytes > self.max_bytes):
+                old_id, old_size = self._stored.popitem(last=False)
+                self.nbytes -= old_size
+                expired.append(old_id)
+        for old_id in expired:
+            try:
+                os.remove(self._path(old_id))
+            except FileNotFoundError:
+                pass
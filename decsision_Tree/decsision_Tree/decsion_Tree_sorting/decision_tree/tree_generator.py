@@ -1,3 +1,16 @@
+from decision_tree.downsample import OperationSampler
+from decision_tree.state_hash import ZobristHash
+from decision_tree.trace import CompactTrace
+from decision_tree.tree_store import TreeStore, as_trace
+from sorting_algorithms.bubble_sort import bubble_sort
+from sorting_algorithms.insertion_sort import insertion_sort
+from sorting_algorithms.selection_sort import selection_sort
+from sorting_algorithms.merge_sort import merge_sort
+from sorting_algorithms.quick_sort import quick_sort
+from sorting_algorithms.heap_sort import heap_sort
+from sorting_algorithms.registry import DISPLAY_NAMES, get_sort_function
+
+
 class TreeNode:
     def __init__(self, operation=None, state=None):
         """
@@ -19,15 +32,83 @@ class TreeNode:
         return f"TreeNode(op={op_type}, state={self.state}, children={len(self.children)})"
 
 
-def build_decision_tree(operations_log, max_nodes=100):
+def _replay(operations_log):
+    """
+    Yield (operation, writes) for every log entry, where writes are the
+    (index, new_value) pairs the operation applied. A CompactTrace already
+    stores them; for a legacy log they are found by diffing consecutive
+    'list_state's (the first entry's writes are empty). Legacy logs may be
+    any iterable, including a generator.
+    """
+    if isinstance(operations_log, CompactTrace):
+        for op in operations_log.iter_operations():
+            yield op, op[3]
+        return
+    previous = None
+    for op in operations_log:
+        state = op.get("list_state")
+        if previous is None:
+            previous = state
+        yield op, [(k, v) for k, (old, v) in enumerate(zip(previous, state)) if old != v]
+        previous = state
+
+
+def _sample_tree(operations_log, max_nodes, priorities, seed, make_item):
+    """
+    Read the log once and choose the operations that become tree nodes.
+
+    make_item(step, op, state) is called for the first operation and for every
+    sampling candidate, with `op` as stored in the log and `state` the live list
+    after it (copy it to keep it). Returns (root_item, edges), where edges is a
+    list of (item, parent_item) pairs in log order, or (None, []) for an empty log.
+    """
+    compact = isinstance(operations_log, CompactTrace)
+    steps = _replay(operations_log)
+    first = next(steps, None)
+    if first is None:
+        return None, []
+
+    op, writes = first
+    if compact:
+        state_hash = ZobristHash(operations_log.initial_state)
+        state_hash.apply(writes)
+    else:
+        state_hash = ZobristHash(op.get("list_state"))
+
+    root = make_item(0, op, state_hash.state)
+    root_state_hash = state_hash.value
+    sampler = OperationSampler(max_nodes - 1, priorities, seed)
+    for step, (op, writes) in enumerate(steps, 1):
+        prev_state_hash = state_hash.value
+        state_hash.apply(writes)
+        op_type = op[0] if compact else op.get("type")
+        sampler.offer(step, op_type, bool(writes),
+                      lambda: (make_item(step, op, state_hash.state), prev_state_hash,
+                               state_hash.value))
+
+    # Link each kept node to the latest earlier node whose state matches the
+    # state before its operation.
+    nodes = {root_state_hash: root}  # Track unique states by hash
+    edges = []
+    for item, prev_state_hash, item_state_hash in sampler.result():
+        edges.append((item, nodes.get(prev_state_hash, root)))
+        nodes[item_state_hash] = item
+    return root, edges
+
+
+def build_decision_tree(operations_log, max_nodes=100, priorities=None, seed=0):
     """
     Build a decision tree from a list of operation logs.
     Supports different sorting approaches by allowing branching based on unique states.
     To avoid an overly large tree for large inputs, only a sample of operations is used.
     
     Parameters:
-    - operations_log: list of operation dictionaries.
+    - operations_log: list (or any iterable) of operation dictionaries, or a
+      CompactTrace.
     - max_nodes: maximum number of nodes to include in the tree.
+    - priorities: dict of operation type -> sampling weight, see
+      decision_tree.downsample.DEFAULT_OPERATION_PRIORITIES.
+    - seed: seed for the sampler, so the same log always gives the same tree.
     
     Each log entry should be a dictionary with keys:
       - 'type': type of operation (e.g., "compare", "swap", "shift", "merge", "insert")
@@ -35,46 +116,96 @@ def build_decision_tree(operations_log, max_nodes=100):
       - 'values': the values involved in the operation
       - 'list_state': state of the list after the operation
 
+    The log is read once. The root is always the first operation. The others
+    pass through an OperationSampler: operations that change the list are
+    kept in preference to comparisons, and within each group by weighted
+    reservoir sampling, so long logs never have to be held in memory.
+
+    States are identified by a rolling Zobrist hash updated from the positions
+    each operation writes, so matching a node to its parent state is O(1) per
+    step for a CompactTrace, and no per-state tuples are kept. Only sampling
+    candidates get a copy of their list state.
+
     Returns the root node of the decision tree.
     """
-    if not operations_log:
-        return None
+    compact = isinstance(operations_log, CompactTrace)
 
-    total_ops = len(operations_log)
-    # Determine sample rate; use every operation if total_ops <= max_nodes
-    sample_rate = 1 if total_ops <= max_nodes else total_ops // max_nodes
-
-    # Create the root node from the first operation
-    root = TreeNode(operation=operations_log[0], state=operations_log[0].get("list_state"))
-    nodes = {tuple(root.state): root}  # Track unique states
-
-    # Build tree by sampling the operations log
-    for i in range(1, total_ops):
-        if i % sample_rate != 0:
-            continue
-        op = operations_log[i]
-        state_tuple = tuple(op.get("list_state"))
-        new_node = TreeNode(operation=op, state=op.get("list_state"))
-        # Link to the node whose state matches the previous operation's state
-        prev_state_tuple = tuple(operations_log[i - 1].get("list_state"))
-        parent_node = nodes.get(prev_state_tuple, root)
-        parent_node.add_child(new_node)
-        nodes[state_tuple] = new_node
+    def make_node(step, op, state):
+        if compact:
+            op = CompactTrace._as_dict(op, list(state))
+        return TreeNode(operation=op, state=op.get("list_state"))
 
+    root, edges = _sample_tree(operations_log, max_nodes, priorities, seed, make_node)
+    for new_node, parent_node in edges:
+        parent_node.add_child(new_node)
     return root
 
 
+def build_tree_store(operations_log, max_nodes=100, priorities=None, seed=0):
+    """
+    Same tree as build_decision_tree, held in a TreeStore: nodes are rows of
+    int arrays pointing into the trace instead of objects holding state copies.
+    A legacy log is converted to a CompactTrace first. Use store.root for a
+    TreeNode-compatible view.
+    """
+    trace = as_trace(operations_log)
+    store = TreeStore(trace)
+    root, edges = _sample_tree(trace, max_nodes, priorities, seed, lambda step, op, state: step)
+    if root is None:
+        return store
+    node_ids = {root: store.add_node(root)}
+    for step, parent_step in edges:
+        node_ids[step] = store.add_node(step, node_ids[parent_step])
+    return store
+
+
 def print_tree(node, level=0):
     """
-    Recursively prints the decision tree structure for debugging/visualization.
+    Prints the decision tree structure for debugging/visualization.
+    Walks the tree with an explicit stack, so deep chains do not hit the
+    recursion limit.
     """
-    if node is None:
-        return
-    indent = "  " * level
-    op_type = node.operation.get("type") if node.operation else "None"
-    print(f"{indent}Node: {op_type} | State: {node.state}")
-    for child in node.children:
-        print_tree(child, level + 1)
+    stack = [(node, level)] if node is not None else []
+    while stack:
+        node, level = stack.pop()
+        indent = "  " * level
+        op_type = node.operation.get("type") if node.operation else "None"
+        print(f"{indent}Node: {op_type} | State: {node.state}")
+        stack.extend((child, level + 1) for child in reversed(node.children))
+
+
+def tree_to_table(root):
+    """
+    Serialise a decision tree into a flat node table, without recursion.
+
+    Returns a dictionary with:
+      - 'nodes': one entry per node in depth-first order, each with 'id',
+        'parent_id' (None for the root), 'op' (the operation without its list
+        state) and 'state_ref' (an index into 'states').
+      - 'states': the distinct list states, each stored once.
+
+    The table can be fed straight to d3.stratify(); returns None for an empty tree.
+    """
+    if root is None:
+        return None
+    nodes = []
+    states = []
+    state_refs = {}
+    stack = [(root, None)]
+    while stack:
+        node, parent_id = stack.pop()
+        state_key = tuple(node.state) if node.state is not None else None
+        state_ref = state_refs.get(state_key)
+        if state_ref is None:
+            state_ref = state_refs[state_key] = len(states)
+            states.append(node.state)
+        op = None
+        if node.operation is not None:
+            op = {key: value for key, value in node.operation.items() if key != "list_state"}
+        node_id = len(nodes)
+        nodes.append({"id": node_id, "parent_id": parent_id, "op": op, "state_ref": state_ref})
+        stack.extend((child, node_id) for child in reversed(node.children))
+    return {"nodes": nodes, "states": states}
 
 
 def get_subtree(root, start_index):
@@ -93,248 +224,39 @@ def get_subtree(root, start_index):
 
 
 # ---- Sorting algorithms with logging ----
+# The *_with_log functions run the plain sorting_algorithms implementations with
+# a CompactTrace as their tracer, which stores only the positions an operation
+# writes to. Pass compact=True to get the trace itself; otherwise it is expanded
+# into the legacy list of operation dictionaries. An existing trace (or any
+# object with a compatible record() method) can be passed in as `trace`.
+
+def traced(sort_func):
+    """
+    Wrap a sorting function that accepts a `tracer` into a *_with_log function
+    returning (sorted_list, operations_log).
+    """
+    def sort_with_log(arr, compact=False, trace=None):
+        a = arr.copy()
+        trace = CompactTrace(a) if trace is None else trace
+        a = sort_func(a, tracer=trace)
+        return a, trace if compact else trace.to_log()
+
+    sort_with_log.__name__ = f"{sort_func.__name__}_with_log"
+    return sort_with_log
 
-def bubble_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-    n = len(a)
-    for i in range(n):
-        for j in range(0, n - i - 1):
-            # Log comparison
-            log.append({
-                "type": "compare",
-                "indices": (j, j + 1),
-                "values": (a[j], a[j + 1]),
-                "list_state": list(a)
-            })
-            if a[j] > a[j + 1]:
-                a[j], a[j + 1] = a[j + 1], a[j]
-                log.append({
-                    "type": "swap",
-                    "indices": (j, j + 1),
-                    "values": (a[j], a[j + 1]),
-                    "list_state": list(a)
-                })
-    return a, log
-
-
-def insertion_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-    for i in range(1, len(a)):
-        key = a[i]
-        j = i - 1
-        while j >= 0 and a[j] > key:
-            log.append({
-                "type": "compare",
-                "indices": (j, i),
-                "values": (a[j], key),
-                "list_state": list(a)
-            })
-            # Shift the element to the right
-            a[j + 1] = a[j]
-            log.append({
-                "type": "shift",
-                "indices": (j, j + 1),
-                "values": (a[j], key),
-                "list_state": list(a)
-            })
-            j -= 1
-        a[j + 1] = key
-        log.append({
-            "type": "insert",
-            "indices": (j + 1,),
-            "values": (key,),
-            "list_state": list(a)
-        })
-    return a, log
-
-
-def heap_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-    n = len(a)
-
-    def heapify(a, n, i):
-        largest = i
-        l = 2 * i + 1
-        r = 2 * i + 2
-
-        if l < n:
-            log.append({
-                "type": "compare",
-                "indices": (i, l),
-                "values": (a[largest], a[l]),
-                "list_state": list(a)
-            })
-            if a[l] > a[largest]:
-                largest = l
-
-        if r < n:
-            log.append({
-                "type": "compare",
-                "indices": (largest, r),
-                "values": (a[largest], a[r]),
-                "list_state": list(a)
-            })
-            if a[r] > a[largest]:
-                largest = r
-
-        if largest != i:
-            a[i], a[largest] = a[largest], a[i]
-            log.append({
-                "type": "swap",
-                "indices": (i, largest),
-                "values": (a[i], a[largest]),
-                "list_state": list(a)
-            })
-            heapify(a, n, largest)
-
-    # Build max heap
-    for i in range(n // 2 - 1, -1, -1):
-        heapify(a, n, i)
-
-    # Heap sort
-    for i in range(n - 1, 0, -1):
-        a[0], a[i] = a[i], a[0]
-        log.append({
-            "type": "swap",
-            "indices": (0, i),
-            "values": (a[0], a[i]),
-            "list_state": list(a)
-        })
-        heapify(a, i, 0)
-
-    return a, log
-
-
-def merge_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-
-    def merge_sort_recursive(a, left, right):
-        if right - left > 1:
-            mid = (left + right) // 2
-            merge_sort_recursive(a, left, mid)
-            merge_sort_recursive(a, mid, right)
-            merge(a, left, mid, right)
-
-    def merge(a, left, mid, right):
-        left_part = a[left:mid]
-        right_part = a[mid:right]
-        i = j = 0
-        k = left
-        while i < len(left_part) and j < len(right_part):
-            log.append({
-                "type": "compare",
-                "indices": (left + i, mid + j),
-                "values": (left_part[i], right_part[j]),
-                "list_state": list(a)
-            })
-            if left_part[i] <= right_part[j]:
-                a[k] = left_part[i]
-                i += 1
-            else:
-                a[k] = right_part[j]
-                j += 1
-            log.append({
-                "type": "merge",
-                "indices": (k,),
-                "values": (a[k],),
-                "list_state": list(a)
-            })
-            k += 1
-        while i < len(left_part):
-            a[k] = left_part[i]
-            log.append({
-                "type": "merge",
-                "indices": (k,),
-                "values": (a[k],),
-                "list_state": list(a)
-            })
-            i += 1
-            k += 1
-        while j < len(right_part):
-            a[k] = right_part[j]
-            log.append({
-                "type": "merge",
-                "indices": (k,),
-                "values": (a[k],),
-                "list_state": list(a)
-            })
-            j += 1
-            k += 1
-
-    merge_sort_recursive(a, 0, len(a))
-    return a, log
-
-
-def quick_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-
-    def quick_sort_recursive(a, low, high):
-        if low < high:
-            pivot_index = partition(a, low, high)
-            quick_sort_recursive(a, low, pivot_index - 1)
-            quick_sort_recursive(a, pivot_index + 1, high)
-
-    def partition(a, low, high):
-        pivot = a[high]  # Choose the last element as pivot
-        i = low - 1
-        for j in range(low, high):
-            log.append({
-                "type": "compare",
-                "indices": (j, high),
-                "values": (a[j], pivot),
-                "list_state": list(a)
-            })
-            if a[j] <= pivot:
-                i += 1
-                a[i], a[j] = a[j], a[i]
-                log.append({
-                    "type": "swap",
-                    "indices": (i, j),
-                    "values": (a[i], a[j]),
-                    "list_state": list(a)
-                })
-        a[i + 1], a[high] = a[high], a[i + 1]
-        log.append({
-            "type": "swap",
-            "indices": (i + 1, high),
-            "values": (a[i + 1], a[high]),
-            "list_state": list(a)
-        })
-        return i + 1
-
-    quick_sort_recursive(a, 0, len(a) - 1)
-    return a, log
-
-
-def selection_sort_with_log(arr):
-    log = []
-    a = arr.copy()
-    n = len(a)
-    for i in range(n):
-        min_index = i
-        for j in range(i + 1, n):
-            log.append({
-                "type": "compare",
-                "indices": (min_index, j),
-                "values": (a[min_index], a[j]),
-                "list_state": list(a)
-            })
-            if a[j] < a[min_index]:
-                min_index = j
-        if min_index != i:
-            a[i], a[min_index] = a[min_index], a[i]
-            log.append({
-                "type": "swap",
-                "indices": (i, min_index),
-                "values": (a[i], a[min_index]),
-                "list_state": list(a)
-            })
-    return a, log
+
+def get_traced_sort(algorithm):
+    """Return the *_with_log function for a registered algorithm name, or None."""
+    sort_func = get_sort_function(algorithm)
+    return traced(sort_func) if sort_func is not None else None
+
+
+bubble_sort_with_log = traced(bubble_sort)
+insertion_sort_with_log = traced(insertion_sort)
+heap_sort_with_log = traced(heap_sort)
+merge_sort_with_log = traced(merge_sort)
+quick_sort_with_log = traced(quick_sort)
+selection_sort_with_log = traced(selection_sort)
 
 
 # ---- Main execution: take user input, run each sort, and generate its decision tree ----
@@ -347,18 +269,9 @@ if __name__ == "__main__":
         print("Invalid input. Please enter only numbers separated by spaces.")
         exit(1)
 
-    algorithms = {
-        "Bubble Sort": bubble_sort_with_log,
-        "Insertion Sort": insertion_sort_with_log,
-        "Heap Sort": heap_sort_with_log,
-        "Merge Sort": merge_sort_with_log,
-        "Quick Sort": quick_sort_with_log,
-        "Selection Sort": selection_sort_with_log
-    }
-    
-    for name, sort_func in algorithms.items():
-        print(f"\n{name}:")
-        sorted_list, op_log = sort_func(test_list)
+    for algorithm, display_name in DISPLAY_NAMES.items():
+        print(f"\n{display_name}:")
+        sorted_list, op_log = get_traced_sort(algorithm)(test_list)
         print(f"Sorted list: {sorted_list}")
         # Use our adjusted decision tree builder with sampling
         tree = build_decision_tree(op_log, max_nodes=100)
@@ -0,0 +1,135 @@
+from array import array
+
+from decision_tree.trace import CompactTrace
+
+# Operation types with fixed codes; other types get the next free code in
+# the store that first sees them.
+OPERATION_TYPES = ("compare", "swap", "shift", "insert", "merge")
+
+NO_NODE = -1
+
+
+class TreeStore:
+    def __init__(self, trace):
+        """
+        Compact, array-backed decision tree.
+
+        Nodes are rows in parallel int arrays (struct of arrays): parent,
+        first_child and next_sibling link the tree, op_code holds the operation
+        type as a small int, and step is the node's index into `trace`, the
+        CompactTrace the tree was sampled from. States and operation details are
+        not copied into the tree; they are rebuilt from the trace on access.
+        A node costs a few dozen bytes instead of a TreeNode's dict, operation
+        dict and list copy.
+
+        Parameters:
+        - trace: the CompactTrace that node steps refer to.
+        """
+        self.trace = trace
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.op_code = array("B")
+        self.step = array("i")
+        self._last_child = array("i")
+        self.op_names = list(OPERATION_TYPES)
+        self._op_codes = {name: code for code, name in enumerate(self.op_names)}
+
+    def __len__(self):
+        return len(self.step)
+
+    def add_node(self, step, parent=NO_NODE):
+        """Append the operation at trace index `step` as the last child of `parent`."""
+        op_type = self.trace.op_type(step)
+        code = self._op_codes.get(op_type)
+        if code is None:
+            code = self._op_codes[op_type] = len(self.op_names)
+            self.op_names.append(op_type)
+        node = len(self.step)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self._last_child.append(NO_NODE)
+        self.op_code.append(code)
+        self.step.append(step)
+        if parent != NO_NODE:
+            last = self._last_child[parent]
+            if last == NO_NODE:
+                self.first_child[parent] = node
+            else:
+                self.next_sibling[last] = node
+            self._last_child[parent] = node
+        return node
+
+    def children(self, node):
+        """Yield the child ids of `node` in insertion order."""
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def op_type(self, node):
+        return self.op_names[self.op_code[node]]
+
+    def state(self, node):
+        """List state after the node's operation, rebuilt from the trace."""
+        return self.trace.state_at(self.step[node])
+
+    def operation(self, node):
+        """The node's operation in the legacy dictionary format."""
+        return self.trace[self.step[node]]
+
+    @property
+    def root(self):
+        """TreeNode-compatible view of the root, or None for an empty store."""
+        return TreeNodeView(self, 0) if len(self) else None
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays (the trace is not counted)."""
+        return sum(a.itemsize * len(a) for a in (
+            self.parent, self.first_child, self.next_sibling, self.op_code, self.step,
+            self._last_child
+        ))
+
+
+class TreeNodeView:
+    """
+    Read-only TreeNode stand-in for a node of a TreeStore, created on demand.
+    Exposes the same operation, state and children attributes, so print_tree,
+    get_subtree and tree_to_table work on stores unchanged.
+    """
+    __slots__ = ("store", "id")
+
+    def __init__(self, store, node_id):
+        self.store = store
+        self.id = node_id
+
+    @property
+    def operation(self):
+        return self.store.operation(self.id)
+
+    @property
+    def state(self):
+        return self.store.state(self.id)
+
+    @property
+    def children(self):
+        return [TreeNodeView(self.store, child) for child in self.store.children(self.id)]
+
+    def __eq__(self, other):
+        return isinstance(other, TreeNodeView) and other.store is self.store and other.id == self.id
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    def __repr__(self):
+        return (f"TreeNodeView(id={self.id}, op={self.store.op_type(self.id)}, "
+                f"children={sum(1 for _ in self.store.children(self.id))})")
+
+
+def as_trace(operations_log):
+    """Return `operations_log` as a CompactTrace, converting a legacy log."""
+    if isinstance(operations_log, CompactTrace):
+        return operations_log
+    return CompactTrace.from_log(list(operations_log))
@@ -0,0 +1,142 @@
+# A galloping merge switches to exponential search once one side has supplied
+# this many elements in a row, as in timsort.
+MIN_GALLOP = 7
+
+
+def bottom_up_merge_sort(arr, track_comparisons=False, tracer=None, gallop=False):
+    """
+    Performs an iterative, bottom-up merge sort on the provided list.
+
+    Runs of width 1, 2, 4, ... are merged one pass at a time, alternating
+    between the list and a single buffer allocated up front, so no slices or
+    per-merge lists are created. When the number of passes is odd the first one
+    is done in place, so the last pass always ends in the list itself.
+
+    With gallop=True, once one side of a merge has won MIN_GALLOP comparisons
+    in a row, the merge finds how far that side's run extends with an
+    exponential search and copies it in one go, so presorted data needs far
+    fewer comparisons.
+
+    If track_comparisons is True, returns the total number of comparisons made.
+    Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison and every write of a pass (applied as
+    if that pass merged in place) is reported to
+    tracer.record(type, indices, values, writes).
+    """
+    comparisons = 0
+    n = len(arr)
+
+    def not_after(src, a, b):
+        # True when src[a] may be placed before src[b] (ties keep the left one).
+        nonlocal comparisons
+        comparisons += 1
+        if tracer is not None:
+            tracer.record("compare", (a, b), (src[a], src[b]))
+        return src[a] <= src[b]
+
+    def before(src, a, b):
+        nonlocal comparisons
+        comparisons += 1
+        if tracer is not None:
+            tracer.record("compare", (a, b), (src[a], src[b]))
+        return src[a] < src[b]
+
+    def put(dst, k, value):
+        dst[k] = value
+        if tracer is not None:
+            tracer.record("merge", (k,), (value,), ((k, value),))
+
+    def leading(lo, hi, probe):
+        """
+        Length of the prefix of [lo, hi) on which the monotone `probe` holds,
+        found by exponential then binary search.
+        """
+        known, limit = 0, 1
+        while limit <= hi - lo and probe(lo + limit - 1):
+            known = limit
+            limit *= 2
+        low, high = known, min(limit, hi - lo + 1) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if probe(lo + middle - 1):
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def merge(src, dst, left, mid, right):
+        nonlocal comparisons
+        i, j, k = left, mid, left
+        left_wins = right_wins = 0
+        while i < mid and j < right:
+            if gallop and left_wins >= MIN_GALLOP:
+                count = leading(i, mid, lambda index: not_after(src, index, j))
+                for index in range(i, i + count):
+                    put(dst, k, src[index])
+                    k += 1
+                i += count
+                left_wins = 0
+                continue
+            if gallop and right_wins >= MIN_GALLOP:
+                count = leading(j, right, lambda index: before(src, index, i))
+                for index in range(j, j + count):
+                    put(dst, k, src[index])
+                    k += 1
+                j += count
+                right_wins = 0
+                continue
+            # The common step is written out rather than calling the helpers,
+            # which would dominate its cost.
+            comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (i, j), (src[i], src[j]))
+            if src[i] <= src[j]:
+                dst[k] = src[i]
+                i += 1
+                left_wins += 1
+                right_wins = 0
+            else:
+                dst[k] = src[j]
+                j += 1
+                right_wins += 1
+                left_wins = 0
+            if tracer is not None:
+                tracer.record("merge", (k,), (dst[k],), ((k, dst[k]),))
+            k += 1
+        for index in range(i, mid):
+            put(dst, k, src[index])
+            k += 1
+        for index in range(j, right):
+            put(dst, k, src[index])
+            k += 1
+
+    passes = (n - 1).bit_length() if n > 1 else 0
+    width = 1
+    if passes % 2:
+        # Merging pairs needs no buffer: swap each pair that is out of order.
+        for left in range(0, n - 1, 2):
+            if before(arr, left + 1, left):
+                arr[left], arr[left + 1] = arr[left + 1], arr[left]
+                if tracer is not None:
+                    tracer.record("swap", (left, left + 1), (arr[left], arr[left + 1]),
+                                  ((left, arr[left]), (left + 1, arr[left + 1])))
+        width = 2
+
+    src, dst = arr, [None] * n if passes else []
+    while width < n:
+        for left in range(0, n, 2 * width):
+            mid = min(left + width, n)
+            right = min(left + 2 * width, n)
+            if mid < right:
+                merge(src, dst, left, mid, right)
+            else:
+                for index in range(left, right):
+                    dst[index] = src[index]
+        src, dst = dst, src
+        width *= 2
+    return comparisons if track_comparisons else arr
+
+
+def galloping_merge_sort(arr, track_comparisons=False, tracer=None):
+    """bottom_up_merge_sort with galloping merges."""
+    return bottom_up_merge_sort(arr, track_comparisons, tracer, gallop=True)
@@ -1,15 +1,22 @@
-def bubble_sort(arr, track_comparisons=False):
+def bubble_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs bubble sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison and swap is reported to
+    tracer.record(type, indices, values, writes).
     """
     comparisons = 0
     n = len(arr)
     for i in range(n):
         for j in range(0, n - i - 1):
             comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (j, j + 1), (arr[j], arr[j + 1]))
             if arr[j] > arr[j + 1]:
                 arr[j], arr[j + 1] = arr[j + 1], arr[j]
+                if tracer is not None:
+                    tracer.record("swap", (j, j + 1), (arr[j], arr[j + 1]),
+                                  ((j, arr[j]), (j + 1, arr[j + 1])))
     return comparisons if track_comparisons else arr
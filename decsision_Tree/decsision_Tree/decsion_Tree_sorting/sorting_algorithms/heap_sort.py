@@ -1,31 +1,43 @@
-def heap_sort(arr, track_comparisons=False):
+def heap_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs heap sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison and swap is reported to
+    tracer.record(type, indices, values, writes).
     """
     comparisons = 0
 
     def heapify(n, i):
+        # Sift arr[i] down in a loop rather than by recursion.
         nonlocal comparisons
-        largest = i
-        left = 2 * i + 1
-        right = 2 * i + 2
+        while True:
+            largest = i
+            left = 2 * i + 1
+            right = 2 * i + 2
 
-        if left < n:
-            comparisons += 1
-            if arr[left] > arr[largest]:
-                largest = left
+            if left < n:
+                comparisons += 1
+                if tracer is not None:
+                    tracer.record("compare", (i, left), (arr[largest], arr[left]))
+                if arr[left] > arr[largest]:
+                    largest = left
 
-        if right < n:
-            comparisons += 1
-            if arr[right] > arr[largest]:
-                largest = right
+            if right < n:
+                comparisons += 1
+                if tracer is not None:
+                    tracer.record("compare", (largest, right), (arr[largest], arr[right]))
+                if arr[right] > arr[largest]:
+                    largest = right
 
-        if largest != i:
+            if largest == i:
+                return
             arr[i], arr[largest] = arr[largest], arr[i]
-            heapify(n, largest)
+            if tracer is not None:
+                tracer.record("swap", (i, largest), (arr[i], arr[largest]),
+                              ((i, arr[i]), (largest, arr[largest])))
+            i = largest
 
     n = len(arr)
     # Build a max heap.
@@ -35,6 +47,8 @@ def heap_sort(arr, track_comparisons=False):
     # Extract elements one by one.
     for i in range(n - 1, 0, -1):
         arr[0], arr[i] = arr[i], arr[0]
+        if tracer is not None:
+            tracer.record("swap", (0, i), (arr[0], arr[i]), ((0, arr[0]), (i, arr[i])))
         heapify(i, 0)
 
     return comparisons if track_comparisons else arr
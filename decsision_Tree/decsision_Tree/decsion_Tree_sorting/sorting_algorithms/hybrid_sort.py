@@ -0,0 +1,201 @@
+# Segments of at most this many elements are finished with insertion sort.
+INSERTION_CUTOFF = 16
+# Segments longer than this choose their pivot with Tukey's ninther instead of
+# a median of three.
+NINTHER_THRESHOLD = 128
+# Natural runs are merged instead of introsorted when they average at least
+# this many elements.
+MIN_AVERAGE_RUN = 32
+
+
+def hybrid_sort(arr, track_comparisons=False, tracer=None):
+    """
+    Performs a hybrid (introsort with run detection) sort on the provided list.
+
+    The list is first scanned for natural runs, as timsort does: descending
+    runs are reversed, and if the runs are long on average they are merged
+    pairwise. Otherwise the list is introsorted: quick sort with a median of
+    three (or ninther) pivot and Hoare partitioning, switching to heap sort for
+    a segment once the depth limit of 2*log2(n) is reached, and to insertion
+    sort for segments of INSERTION_CUTOFF elements or fewer. The scan stops as
+    soon as the runs are too short to be worth merging, so random input pays
+    only a few comparisons for it.
+
+    If track_comparisons is True, returns the total number of comparisons made.
+    Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison, swap and merge write is reported to
+    tracer.record(type, indices, values, writes).
+    """
+    comparisons = 0
+    n = len(arr)
+
+    def less(i, j):
+        nonlocal comparisons
+        comparisons += 1
+        if tracer is not None:
+            tracer.record("compare", (i, j), (arr[i], arr[j]))
+        return arr[i] < arr[j]
+
+    def swap(i, j):
+        arr[i], arr[j] = arr[j], arr[i]
+        if tracer is not None:
+            tracer.record("swap", (i, j), (arr[i], arr[j]), ((i, arr[i]), (j, arr[j])))
+
+    def insertion_sort_range(lo, hi):
+        for i in range(lo + 1, hi + 1):
+            j = i
+            while j > lo and less(j, j - 1):
+                swap(j - 1, j)
+                j -= 1
+
+    def heap_sort_range(lo, hi):
+        size = hi - lo + 1
+
+        def sift_down(root, end):
+            while True:
+                child = 2 * root + 1
+                if child >= end:
+                    return
+                if child + 1 < end and less(lo + child, lo + child + 1):
+                    child += 1
+                if not less(lo + root, lo + child):
+                    return
+                swap(lo + root, lo + child)
+                root = child
+
+        for start in range(size // 2 - 1, -1, -1):
+            sift_down(start, size)
+        for end in range(size - 1, 0, -1):
+            swap(lo, lo + end)
+            sift_down(0, end)
+
+    def median_of_three(a, b, c):
+        if less(a, b):
+            if less(b, c):
+                return b
+            return c if less(a, c) else a
+        if less(a, c):
+            return a
+        return c if less(b, c) else b
+
+    def choose_pivot(lo, hi):
+        mid = (lo + hi) // 2
+        if hi - lo + 1 <= NINTHER_THRESHOLD:
+            return median_of_three(lo, mid, hi)
+        step = (hi - lo + 1) // 8
+        return median_of_three(
+            median_of_three(lo, lo + step, lo + 2 * step),
+            median_of_three(mid - step, mid, mid + step),
+            median_of_three(hi - 2 * step, hi - step, hi)
+        )
+
+    def partition(lo, hi):
+        # Hoare partition around arr[lo]; both scans stop on keys equal to the
+        # pivot, so runs of duplicates split evenly instead of degrading.
+        swap(lo, choose_pivot(lo, hi))
+        i, j = lo + 1, hi
+        while True:
+            while i <= j and less(i, lo):
+                i += 1
+            while less(lo, j):
+                j -= 1
+            if i >= j:
+                break
+            swap(i, j)
+            i += 1
+            j -= 1
+        swap(lo, j)
+        return j
+
+    def introsort():
+        stack = [(0, n - 1, 2 * max(n, 1).bit_length())]
+        while stack:
+            lo, hi, depth = stack.pop()
+            while hi - lo + 1 > INSERTION_CUTOFF and depth > 0:
+                depth -= 1
+                p = partition(lo, hi)
+                # Continue with the smaller side so the stack stays O(log n).
+                if p - lo < hi - p:
+                    stack.append((p + 1, hi, depth))
+                    hi = p - 1
+                else:
+                    stack.append((lo, p - 1, depth))
+                    lo = p + 1
+            if hi - lo + 1 > INSERTION_CUTOFF:
+                heap_sort_range(lo, hi)
+            else:
+                insertion_sort_range(lo, hi)
+
+    def find_runs(max_runs):
+        """Start indices of the natural runs, or None once there are more than max_runs."""
+        starts = []
+        i = 0
+        while i < n:
+            if len(starts) == max_runs:
+                return None
+            starts.append(i)
+            j = i + 1
+            if j < n and less(j, i):
+                # Strictly descending, so reversing it keeps equal keys in order.
+                while j + 1 < n and less(j + 1, j):
+                    j += 1
+                lo, hi = i, j
+                while lo < hi:
+                    swap(lo, hi)
+                    lo += 1
+                    hi -= 1
+                i = j + 1
+            else:
+                # arr[i + 1] >= arr[i] is already known.
+                j = min(j + 1, n)
+                while j < n and not less(j, j - 1):
+                    j += 1
+                i = j
+        return starts
+
+    def merge(left, mid, right):
+        nonlocal comparisons
+        # Runs already in order need no merge.
+        if not less(mid, mid - 1):
+            return
+        left_part = arr[left:mid]
+        right_part = arr[mid:right]
+        i = j = 0
+        k = left
+        while i < len(left_part) and j < len(right_part):
+            comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (left + i, mid + j), (left_part[i], right_part[j]))
+            if left_part[i] <= right_part[j]:
+                arr[k] = left_part[i]
+                i += 1
+            else:
+                arr[k] = right_part[j]
+                j += 1
+            if tracer is not None:
+                tracer.record("merge", (k,), (arr[k],), ((k, arr[k]),))
+            k += 1
+        for value in left_part[i:] + right_part[j:]:
+            arr[k] = value
+            if tracer is not None:
+                tracer.record("merge", (k,), (value,), ((k, value),))
+            k += 1
+
+    if n <= INSERTION_CUTOFF:
+        insertion_sort_range(0, n - 1)
+        return comparisons if track_comparisons else arr
+
+    starts = find_runs(max(1, n // MIN_AVERAGE_RUN))
+    if starts is None:
+        introsort()
+    else:
+        bounds = starts + [n]
+        while len(bounds) > 2:
+            merged = [0]
+            for k in range(0, len(bounds) - 2, 2):
+                merge(bounds[k], bounds[k + 1], bounds[k + 2])
+                merged.append(bounds[k + 2])
+            if (len(bounds) - 1) % 2:
+                merged.append(n)
+            bounds = merged
+    return comparisons if track_comparisons else arr
@@ -1,9 +1,11 @@
-def insertion_sort(arr, track_comparisons=False):
+def insertion_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs insertion sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison, shift and insert is reported to
+    tracer.record(type, indices, values, writes).
     """
     comparisons = 0
     for i in range(1, len(arr)):
@@ -11,10 +13,16 @@ def insertion_sort(arr, track_comparisons=False):
         j = i - 1
         while j >= 0:
             comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (j, i), (arr[j], key))
             if arr[j] > key:
                 arr[j + 1] = arr[j]
+                if tracer is not None:
+                    tracer.record("shift", (j, j + 1), (arr[j], key), ((j + 1, arr[j]),))
                 j -= 1
             else:
                 break
         arr[j + 1] = key
+        if tracer is not None:
+            tracer.record("insert", (j + 1,), (key,), ((j + 1, key),))
     return comparisons if track_comparisons else arr
@@ -1,38 +1,49 @@
-def merge_sort(arr, track_comparisons=False):
+def merge_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs merge sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list (via returning a new sorted list) and returns it.
+    If a tracer is given, every comparison and every write back into the list
+    is reported to tracer.record(type, indices, values, writes).
     """
     comparisons = 0
+    lst = list(arr)
 
-    def merge(left, right):
+    def merge(left, mid, right):
         nonlocal comparisons
-        merged = []
+        left_part = lst[left:mid]
+        right_part = lst[mid:right]
         i = j = 0
-        while i < len(left) and j < len(right):
+        k = left
+        while i < len(left_part) and j < len(right_part):
             comparisons += 1
-            if left[i] <= right[j]:
-                merged.append(left[i])
+            if tracer is not None:
+                tracer.record("compare", (left + i, mid + j), (left_part[i], right_part[j]))
+            if left_part[i] <= right_part[j]:
+                lst[k] = left_part[i]
                 i += 1
             else:
-                merged.append(right[j])
+                lst[k] = right_part[j]
                 j += 1
-        merged.extend(left[i:])
-        merged.extend(right[j:])
-        return merged
+            if tracer is not None:
+                tracer.record("merge", (k,), (lst[k],), ((k, lst[k]),))
+            k += 1
+        for value in left_part[i:] + right_part[j:]:
+            lst[k] = value
+            if tracer is not None:
+                tracer.record("merge", (k,), (value,), ((k, value),))
+            k += 1
 
-    def merge_sort_recursive(lst):
-        if len(lst) <= 1:
-            return lst
-        mid = len(lst) // 2
-        left = merge_sort_recursive(lst[:mid])
-        right = merge_sort_recursive(lst[mid:])
-        return merge(left, right)
+    def merge_sort_recursive(left, right):
+        if right - left > 1:
+            mid = (left + right) // 2
+            merge_sort_recursive(left, mid)
+            merge_sort_recursive(mid, right)
+            merge(left, mid, right)
 
-    sorted_arr = merge_sort_recursive(arr)
+    merge_sort_recursive(0, len(lst))
     if not track_comparisons:
         # Update the original list if not tracking comparisons
-        arr[:] = sorted_arr
-    return comparisons if track_comparisons else sorted_arr
+        arr[:] = lst
+    return comparisons if track_comparisons else lst
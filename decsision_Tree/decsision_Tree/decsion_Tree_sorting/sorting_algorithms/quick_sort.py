@@ -1,18 +1,29 @@
-def quick_sort(arr, track_comparisons=False):
+def quick_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs quick sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison and swap is reported to
+    tracer.record(type, indices, values, writes).
     """
     comparisons = 0
 
     def _quick_sort(lst, low, high):
-        nonlocal comparisons
-        if low < high:
-            pivot_index = partition(lst, low, high)
-            _quick_sort(lst, low, pivot_index - 1)
-            _quick_sort(lst, pivot_index + 1, high)
+        # Explicit stack instead of recursion: partition the current range,
+        # push the larger side and carry on with the smaller one, so at most
+        # O(log n) ranges are ever pending, even on sorted input.
+        stack = [(low, high)]
+        while stack:
+            low, high = stack.pop()
+            while low < high:
+                pivot_index = partition(lst, low, high)
+                if pivot_index - low < high - pivot_index:
+                    stack.append((pivot_index + 1, high))
+                    high = pivot_index - 1
+                else:
+                    stack.append((low, pivot_index - 1))
+                    low = pivot_index + 1
 
     def partition(lst, low, high):
         nonlocal comparisons
@@ -20,10 +31,17 @@ def quick_sort(arr, track_comparisons=False):
         i = low - 1
         for j in range(low, high):
             comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (j, high), (lst[j], pivot))
             if lst[j] <= pivot:
                 i += 1
                 lst[i], lst[j] = lst[j], lst[i]
+                if tracer is not None:
+                    tracer.record("swap", (i, j), (lst[i], lst[j]), ((i, lst[i]), (j, lst[j])))
         lst[i + 1], lst[high] = lst[high], lst[i + 1]
+        if tracer is not None:
+            tracer.record("swap", (i + 1, high), (lst[i + 1], lst[high]),
+                          ((i + 1, lst[i + 1]), (high, lst[high])))
         return i + 1
 
     _quick_sort(arr, 0, len(arr) - 1)
@@ -0,0 +1,40 @@
+from sorting_algorithms.bubble_sort import bubble_sort
+from sorting_algorithms.insertion_sort import insertion_sort
+from sorting_algorithms.selection_sort import selection_sort
+from sorting_algorithms.merge_sort import merge_sort
+from sorting_algorithms.quick_sort import quick_sort
+from sorting_algorithms.heap_sort import heap_sort
+from sorting_algorithms.hybrid_sort import hybrid_sort
+from sorting_algorithms.bottom_up_merge_sort import bottom_up_merge_sort, galloping_merge_sort
+
+# Registry of sorting algorithms keyed by the name used in the API.
+# Every registered function follows the same contract:
+#   sort_func(arr, track_comparisons=False, tracer=None)
+# where tracer, if given, receives tracer.record(type, indices, values, writes)
+# for each operation. The same function therefore serves both comparison
+# counting (tracer=None) and visualisation (see decision_tree.tree_generator).
+SORTING_ALGORITHMS = {}
+DISPLAY_NAMES = {}
+
+
+def register_algorithm(name, sort_func, display_name):
+    """Make a sorting function available under `name` to the API and analysis."""
+    SORTING_ALGORITHMS[name] = sort_func
+    DISPLAY_NAMES[name] = display_name
+    return sort_func
+
+
+def get_sort_function(name):
+    """Return the sorting function registered under `name`, or None if unknown."""
+    return SORTING_ALGORITHMS.get(name)
+
+
+register_algorithm("bubble_sort", bubble_sort, "Bubble Sort")
+register_algorithm("insertion_sort", insertion_sort, "Insertion Sort")
+register_algorithm("selection_sort", selection_sort, "Selection Sort")
+register_algorithm("merge_sort", merge_sort, "Merge Sort")
+register_algorithm("quick_sort", quick_sort, "Quick Sort")
+register_algorithm("heap_sort", heap_sort, "Heap Sort")
+register_algorithm("hybrid_sort", hybrid_sort, "Hybrid Sort")
+register_algorithm("bottom_up_merge_sort", bottom_up_merge_sort, "Bottom-Up Merge Sort")
+register_algorithm("galloping_merge_sort", galloping_merge_sort, "Galloping Merge Sort")
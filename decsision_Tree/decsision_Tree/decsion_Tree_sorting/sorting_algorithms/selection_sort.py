@@ -1,9 +1,11 @@
-def selection_sort(arr, track_comparisons=False):
+def selection_sort(arr, track_comparisons=False, tracer=None):
     """
     Performs selection sort on the provided list.
     
     If track_comparisons is True, returns the total number of comparisons made.
     Otherwise, sorts the list in-place and returns the sorted list.
+    If a tracer is given, every comparison and swap is reported to
+    tracer.record(type, indices, values, writes).
     """
     comparisons = 0
     n = len(arr)
@@ -11,8 +13,13 @@ def selection_sort(arr, track_comparisons=False):
         min_index = i
         for j in range(i + 1, n):
             comparisons += 1
+            if tracer is not None:
+                tracer.record("compare", (min_index, j), (arr[min_index], arr[j]))
             if arr[j] < arr[min_index]:
                 min_index = j
         if i != min_index:
             arr[i], arr[min_index] = arr[min_index], arr[i]
+            if tracer is not None:
+                tracer.record("swap", (i, min_index), (arr[i], arr[min_index]),
+                              ((i, arr[i]), (min_index, arr[min_index])))
     return comparisons if track_comparisons else arr
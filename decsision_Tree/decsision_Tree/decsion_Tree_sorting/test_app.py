@@ -1,6 +1,48 @@
+import contextlib
+import io
+import itertools
+import math
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
 import json
-from app import app  # Ensure app is importable from app.py
+import numpy as np
+from werkzeug.datastructures import MultiDict
+from app import app, analysis_cache, parse_analysis_options, trace_store  # Ensure app is importable from app.py
+from decision_tree.trace import CompactTrace, PackedTrace
+from decision_tree.trace_store import TraceStore
+from decision_tree.tree_generator import (
+    TreeNode, build_decision_tree, build_tree_store, bubble_sort_with_log, get_subtree,
+    merge_sort_with_log, print_tree, tree_to_table
+)
+from decision_tree.state_hash import ZobristHash
+from sorting_algorithms.registry import SORTING_ALGORITHMS
+from sorting_algorithms.quick_sort import quick_sort
+from sorting_algorithms.heap_sort import heap_sort
+from sorting_algorithms.bubble_sort import bubble_sort
+from sorting_algorithms.hybrid_sort import hybrid_sort
+from sorting_algorithms.merge_sort import merge_sort
+from sorting_algorithms.bottom_up_merge_sort import bottom_up_merge_sort, galloping_merge_sort
+from analysis.average_case_analysis import DEFAULT_TEST_SIZES, analyze_algorithm, run_analysis
+from analysis.result_cache import AnalysisCache, ResponseCache
+from analysis.jobs import AnalysisJobQueue, JobQueueFull
+from analysis.profiling import profile_sort
+from analysis.batch_comparisons import batch_comparison_counts, count_inversions, insertion_sort_counts
+from analysis.benchmark import find_regressions, load_baseline, run_benchmark, save_csv
+from analysis.distributions import DEFAULT_DISTRIBUTION, DISTRIBUTIONS, draw_arrays, generate
+from analysis.bounds import average_case_lower_bound, comparison_bounds, worst_case_lower_bound
+from analysis.exact_comparisons import MOMENT_FORMULAS, exact_comparisons, merge_sort_moments
+from analysis.presortedness import (
+    choose_algorithm, inversions, longest_increasing_subsequence, presortedness, run_lengths
+)
+from decision_tree.comparison_tree import MAX_TREE_SIZE, ComparisonDAG
+
+# Keep the on-disk analysis cache out of the project's instance folder.
+analysis_cache.path = os.path.join(tempfile.mkdtemp(), "analysis_cache.sqlite3")
+trace_store.directory = os.path.join(tempfile.mkdtemp(), "traces")
 
 class AppTestCase(unittest.TestCase):
     def setUp(self):
@@ -36,11 +78,14 @@ class AppTestCase(unittest.TestCase):
         self.assertIn("comparisons", data)
         self.assertIn("operations_log", data)
         self.assertIn("decision_tree", data)
+        nodes = data["decision_tree"]["nodes"]
+        self.assertIsNone(nodes[0]["parent_id"])
+        self.assertTrue(all(node["parent_id"] < node["id"] for node in nodes[1:]))
 
     def test_run_sort_invalid_algorithm(self):
         # Test /api/run_sort with an unsupported algorithm
         payload = {
-            "algorithm": "quick_sort",  # not implemented in our current version
+            "algorithm": "bogo_sort",  # not a registered algorithm
             "list_size": 4
         }
         response = self.client.post(
@@ -52,6 +97,102 @@ class AppTestCase(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn("error", data)
 
+    def test_run_sort_invalid_list_size(self):
+        for route in ('/api/run_sort', '/api/run_sort/stream', '/api/run_sort/binary'):
+            for list_size in ("10", 2.5, [3], True, -1, 10 ** 6):
+                response = self.client.post(route, data=json.dumps({"list_size": list_size}),
+                                            content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+            for body in ('[1, 2]', 'null', 'not json'):
+                response = self.client.post(route, data=body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/run_sort', data=json.dumps({"algorithm": ["quick_sort"]}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_run_sort_distribution(self):
+        payload = {"algorithm": "quick_sort", "list_size": 8, "distribution": "median_of_3_killer"}
+        response = self.client.post('/api/run_sort', data=json.dumps(payload),
+                                    content_type='application/json')
+        data = json.loads(response.data)
+        self.assertEqual(data["original_array"], [1, 5, 3, 7, 2, 4, 6, 8])
+        self.assertEqual(data["sorted_array"], list(range(1, 9)))
+        payload["distribution"] = "bogus"
+        response = self.client.post('/api/run_sort', data=json.dumps(payload),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_run_sort_auto_algorithm(self):
+        payload = {"algorithm": "auto", "list_size": 64, "distribution": "nearly_sorted", "seed": 5}
+        response = self.client.post('/api/run_sort', data=json.dumps(payload),
+                                    content_type='application/json')
+        data = json.loads(response.data)
+        self.assertEqual(data["algorithm"], "insertion_sort")
+        self.assertEqual(data["comparisons"], int(insertion_sort_counts(np.array([data["original_array"]]))[0]))
+        self.assertLessEqual(data["presortedness"]["inversions"], data["comparisons"])
+
+    def test_sort_batch(self):
+        arrays = [[3, 1, 2], [5, 4], [], [2.5, 1], [9, 8, 7]]
+        response = self.client.post('/api/sort/batch', data=json.dumps(
+            {"arrays": arrays, "algorithm": "hybrid_sort", "order": True}
+        ), content_type='application/json')
+        data = json.loads(response.data)
+        self.assertEqual(data["sorted"], [sorted(arr) for arr in arrays])
+        self.assertEqual(data["order"][0], [1, 2, 0])
+        self.assertEqual(data["comparisons"],
+                         [hybrid_sort(list(arr), track_comparisons=True) for arr in arrays])
+
+        matrix = np.random.default_rng(0).integers(0, 100, (500, 8))
+        body = io.BytesIO()
+        np.save(body, matrix)
+        response = self.client.post('/api/sort/batch?format=npy', data=body.getvalue(),
+                                    content_type='application/x-npy')
+        self.assertTrue(np.array_equal(np.load(io.BytesIO(response.data)), np.sort(matrix, axis=1)))
+        response = self.client.post('/api/sort/batch?algorithm=quick_sort', data=body.getvalue(),
+                                    content_type='application/x-npy')
+        self.assertEqual(json.loads(response.data)["comparisons"][:3],
+                         [quick_sort(row.tolist(), track_comparisons=True) for row in matrix[:3]])
+
+        for payload in ({"arrays": [[1], [1, [2]]]}, {"arrays": [["a"]]}, {"rows": []},
+                        {"arrays": [[1]], "algorithm": "bogo_sort"}, {"arrays": [[1, float("nan")]]},
+                        {"arrays": [[True, False]]}):
+            response = self.client.post('/api/sort/batch', data=json.dumps(payload),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        for matrix in (np.array([[1 + 2j, 3]]), np.array([[1.0, np.inf]])):
+            body = io.BytesIO()
+            np.save(body, matrix)
+            response = self.client.post('/api/sort/batch', data=body.getvalue(),
+                                        content_type='application/x-npy')
+            self.assertEqual(response.status_code, 400)
+
+    def test_run_sort_seed_and_cache(self):
+        def post(payload):
+            return self.client.post('/api/run_sort', data=json.dumps(payload),
+                                    content_type='application/json')
+
+        payload = {"algorithm": "quick_sort", "list_size": 50, "seed": 7, "distribution": "zipf"}
+        first, second = post(payload), post(payload)
+        self.assertEqual((first.headers["X-Cache"], second.headers["X-Cache"]), ("miss", "hit"))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(json.loads(first.data)["original_array"], generate("zipf", 50, seed=7))
+        other = json.loads(post(dict(payload, seed=8)).data)
+        self.assertNotEqual(other["original_array"], json.loads(first.data)["original_array"])
+        unseeded = post({"algorithm": "quick_sort", "list_size": 50})
+        self.assertEqual(unseeded.headers["X-Cache"], "miss")
+        for seed in (-1, "7", 1.5, True):
+            self.assertEqual(post(dict(payload, seed=seed)).status_code, 400)
+
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", b"1234")
+        cache.put("b", b"5678")
+        cache.get("a")
+        cache.put("c", b"90ab")
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (b"1234", None, b"90ab"))
+        self.assertEqual(cache.nbytes, 8)
+        cache.put("d", b"x" * 11)
+        self.assertIsNone(cache.get("d"))
+
     def test_analysis_endpoint(self):
         # Test the /api/analysis endpoint
         response = self.client.get('/api/analysis')
@@ -60,5 +201,542 @@ class AppTestCase(unittest.TestCase):
         # Check for expected keys in analysis results
         self.assertTrue("analysis_results" in data or "message" in data)
 
+    def test_run_sort_returns_compact_trace(self):
+        # Large inputs still get a compact trace that replays to the sorted array
+        payload = {"algorithm": "bubble_sort", "list_size": 30}
+        response = self.client.post(
+            '/api/run_sort',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        trace = CompactTrace.from_dict(data["trace"])
+        self.assertEqual(trace.initial_state, data["original_array"])
+        self.assertEqual(trace.state_at(len(trace) - 1), data["sorted_array"])
+
+    def test_run_sort_stream(self):
+        # The streaming endpoint emits NDJSON: start, one line per operation, end
+        payload = {"algorithm": "bubble_sort", "list_size": 12}
+        response = self.client.post(
+            '/api/run_sort/stream',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(lines[0]["type"], "start")
+        self.assertEqual(lines[-1]["type"], "end")
+        state = list(lines[0]["original_array"])
+        for op in lines[1:-1]:
+            for index, value in op["writes"]:
+                state[index] = value
+        self.assertEqual(state, lines[-1]["sorted_array"])
+        self.assertEqual(lines[-1]["comparisons"], 12 * 11 // 2)
+
+    def test_run_sort_all_registered_algorithms(self):
+        # Every registered algorithm can be traced, and the traced comparison
+        # count matches the plain implementation's count
+        for algorithm, sort_func in SORTING_ALGORITHMS.items():
+            payload = {"algorithm": algorithm, "list_size": 4}
+            response = self.client.post(
+                '/api/run_sort',
+                data=json.dumps(payload),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 200, algorithm)
+            data = json.loads(response.data)
+            self.assertEqual(data["sorted_array"], sorted(data["original_array"]))
+            expected = sort_func(list(data["original_array"]), track_comparisons=True)
+            self.assertEqual(data["comparisons"], expected)
+
+    def test_analysis_parameters(self):
+        response = self.client.get('/api/analysis?sizes=8,16&iterations=400&tolerance=0.05&batch=1')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(sorted(data["analysis_results"]), ["16", "8"])
+        quick = data["analysis_results"]["16"]["Quick Sort"]
+        self.assertLess(quick["iterations"], 400)
+        self.assertLessEqual(quick["confidence_half_width"], 0.05 * quick["average_comparisons"])
+        self.assertIn("variance", quick)
+        bubble = data["analysis_results"]["8"]["Bubble Sort"]
+        self.assertEqual(bubble["variance"], 0.0)
+
+        response = self.client.get('/api/analysis?sizes=a,b')
+        self.assertEqual(response.status_code, 400)
+        for query in ("sizes=0", "sizes=8,100000", "sizes=10000", "sizes=100000&batch=1"):
+            response = self.client.get(f'/api/analysis?{query}')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(parse_analysis_options(MultiDict({"sizes": "10000", "batch": "1"}))["test_sizes"], [10000])
+        response = self.client.get('/api/analysis?sizes=8&tree_size=8')
+        self.assertEqual(response.status_code, 400)
+        for seed in ("-1", "abc", "1.5"):
+            response = self.client.get(f'/api/analysis?sizes=8&seed={seed}')
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/analysis?sizes=64&iterations=20&profile=merge')
+        profiles = json.loads(response.data)["profiles"]["64"]
+        self.assertEqual(sorted(profiles), ["Bottom-Up Merge Sort", "Galloping Merge Sort", "Merge Sort"])
+        self.assertGreater(profiles["Merge Sort"]["peak_bytes"], 0)
+        response = self.client.get('/api/analysis?profile=bogo_sort')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/analysis?sizes=8&iterations=10&distribution=sorted')
+        data = json.loads(response.data)
+        self.assertEqual(data["distribution"], "sorted")
+        self.assertEqual(data["analysis_results"]["8"]["Insertion Sort"]["average_comparisons"], 7)
+        response = self.client.get('/api/analysis?distribution=bogus')
+        self.assertEqual(response.status_code, 400)
+
+    def test_analysis_job(self):
+        response = self.client.post(
+            '/api/analysis/jobs',
+            data=json.dumps({"sizes": [6, 12], "iterations": 50, "seed": 4}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        status_url = json.loads(response.data)["status_url"]
+        deadline = time.time() + 30
+        while True:
+            job = json.loads(self.client.get(status_url).data)
+            if job["status"] in ("done", "failed") or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["progress"]["fraction"], 1.0)
+        expected = json.loads(json.dumps(run_analysis(test_sizes=[6, 12], iterations=50, seed=4)))
+        self.assertEqual(job["result"]["analysis_results"], expected["analysis_results"])
+        self.assertEqual(job["partial_results"], expected["analysis_results"])
+
+        self.assertEqual(self.client.get('/api/analysis/jobs/missing').status_code, 404)
+
+    def test_analysis_job_queue_is_bounded(self):
+        release = threading.Event()
+        queue = AnalysisJobQueue(concurrent_jobs=1, max_pending=2)
+        queue._run = lambda job, options: release.wait()
+        try:
+            first = queue.submit(test_sizes=[6], seed=1)
+            self.assertEqual(queue.submit(test_sizes=[6], seed=1), first)
+            queue.submit(test_sizes=[6], seed=2)
+            with self.assertRaises(JobQueueFull):
+                queue.submit(test_sizes=[6], seed=3)
+        finally:
+            release.set()
+
+
+class CompactTraceTestCase(unittest.TestCase):
+    def test_matches_full_snapshot_log(self):
+        arr = [9, 4, 7, 1, 8, 2, 6, 3, 5, 0]
+        for sort_func in (bubble_sort_with_log, merge_sort_with_log):
+            _, trace = sort_func(arr, compact=True)
+            data = trace.to_dict()
+            data["checkpoint_interval"] = 3
+            trace_small = CompactTrace.from_dict(data)
+            full_log = trace.to_log()
+            self.assertEqual(len(full_log), len(trace))
+            for step, op in enumerate(full_log):
+                self.assertEqual(trace.state_at(step), op["list_state"])
+                self.assertEqual(trace_small.state_at(step), op["list_state"])
+                self.assertEqual(trace[step], op)
+            self.assertEqual(trace.state_at(-1), arr)
+
+    def test_columns_widen_to_fit(self):
+        _, trace = bubble_sort_with_log(list(range(300, 0, -1)), compact=True)
+        self.assertEqual(trace.columns["indices"].typecode, "h")
+        size = sum(len(column) * column.itemsize for column in trace.columns.values())
+        self.assertLessEqual(size, 16 * len(trace))
+
+        trace = CompactTrace([0, 0])
+        operations = [("compare", (0, 1), (5, 7), ()), ("swap", (0, 1), (300, 2 ** 40), ((0, 2 ** 40),)),
+                      ("merge", (1,), (2.5,), ((1, 2.5),)), ("compare", (0, 1), (2 ** 70, 1), ())]
+        for op in operations:
+            trace.record(*op)
+        self.assertEqual(list(trace.operations), operations)
+        self.assertEqual(trace.operations[1:3], operations[1:3])
+        self.assertEqual(trace.final_state, [2 ** 40, 2.5])
+        self.assertEqual(trace.state_at(0), [0, 0])
+        self.assertEqual((trace.count("compare"), trace.op_type(2)), (2, "merge"))
+
+    def test_binary_trace_round_trip(self):
+        arrays = ([], [4], [3.5, -1.25, 2.0], list(range(300, 0, -1)), [2 ** 62, -5, 7])
+        for arr in arrays:
+            for sort_func in (bubble_sort_with_log, merge_sort_with_log):
+                _, trace = sort_func(arr, compact=True)
+                decoded = CompactTrace.from_bytes(trace.to_bytes())
+                self.assertEqual(decoded.operations, trace.operations)
+                self.assertEqual(decoded.initial_state, trace.initial_state)
+                self.assertEqual(decoded.checkpoint_interval, trace.checkpoint_interval)
+        with self.assertRaises(ValueError):
+            CompactTrace.from_bytes(b"JUNK" + bytes(28))
+
+        client = app.test_client()
+        response = client.post('/api/run_sort/binary', data=json.dumps(
+            {"algorithm": "merge_sort", "list_size": 100}
+        ), content_type='application/json')
+        self.assertEqual(response.headers["X-Sort-Algorithm"], "merge_sort")
+        trace = CompactTrace.from_bytes(response.data)
+        self.assertEqual(trace.final_state, sorted(trace.initial_state))
+        legacy = json.dumps(trace.to_log())
+        self.assertLess(len(response.data) * 10, len(legacy))
+
+    def test_packed_trace_seek(self):
+        arr = [5, 3, 9, 1, 7, 3, 8, 2, 6, 4, 0, 5] * 10
+        for sort_func in (bubble_sort_with_log, merge_sort_with_log):
+            _, trace = sort_func(arr, compact=True)
+            packed = PackedTrace(trace.to_bytes())
+            self.assertEqual(len(packed), len(trace))
+            for step in range(0, len(trace) + 1, 7):
+                self.assertEqual(packed.state(step), trace.state_at(step - 1))
+            self.assertEqual(packed.state(len(trace)), sorted(arr))
+            window = packed.operations(100, 140)
+            self.assertEqual(len(window), 40)
+            for op, (op_type, indices, values, writes) in zip(window, trace.operations[100:140]):
+                self.assertEqual((op["type"], op["indices"], op["values"]), (op_type, list(indices), list(values)))
+                self.assertEqual(op["writes"], [list(w) for w in writes])
+
+        store = TraceStore(tempfile.mkdtemp(), max_cached=1, max_stored=2)
+        ids = [store.put(trace) for _ in range(3)]
+        self.assertIsNone(store.get(ids[0]))
+        self.assertEqual(store.get(ids[1]).state(5), trace.state_at(4))
+        self.assertIsNone(store.get("../../etc/passwd"))
+
+        size = len(trace.to_bytes())
+        store = TraceStore(tempfile.mkdtemp(), max_bytes=2 * size, max_trace_bytes=size)
+        ids = [store.put(trace) for _ in range(3)]
+        self.assertEqual(store.nbytes, 2 * size)
+        self.assertNotIn(ids[0], TraceStore(store.directory))
+        self.assertIn(ids[2], store)
+        _, longer = bubble_sort_with_log(arr + [1], compact=True)
+        self.assertIsNone(store.put(longer))
+
+    def test_trace_replay_endpoints(self):
+        client = app.test_client()
+        response = client.post('/api/run_sort', data=json.dumps(
+            {"algorithm": "bubble_sort", "list_size": 30}
+        ), content_type='application/json')
+        data = json.loads(response.data)
+        trace = CompactTrace.from_dict(data["trace"])
+        window = json.loads(client.get(f'/api/trace/{data["trace_id"]}?from=10&count=5').data)
+        self.assertEqual(window["total"], len(trace))
+        self.assertEqual([op["type"] for op in window["operations"]],
+                         [op[0] for op in trace.operations[10:15]])
+        state = json.loads(client.get(f'/api/trace/{data["trace_id"]}/state/10').data)
+        self.assertEqual(state["state"], trace.state_at(9))
+        self.assertEqual(client.get(f'/api/trace/{data["trace_id"]}/state/{len(trace) + 1}').status_code, 400)
+        self.assertEqual(client.get(f'/api/trace/{data["trace_id"]}?from=-1').status_code, 400)
+        self.assertEqual(client.get('/api/trace/' + "0" * 32).status_code, 404)
+
+        limit, trace_store.max_trace_bytes = trace_store.max_trace_bytes, 1000
+        try:
+            response = client.post('/api/run_sort', data=json.dumps(
+                {"algorithm": "bubble_sort", "list_size": 30, "seed": 1}
+            ), content_type='application/json')
+            self.assertIsNone(json.loads(response.data)["trace_id"])
+        finally:
+            trace_store.max_trace_bytes = limit
+
+    def test_deep_tree_serialisation(self):
+        root = node = TreeNode({"type": "compare", "indices": (0, 1), "values": (2, 1),
+                                "list_state": [2, 1]}, [2, 1])
+        for step in range(5000):
+            child = TreeNode({"type": "swap", "indices": (0, 1), "values": (1, 2)}, [step % 2, 1])
+            node.add_child(child)
+            node = child
+        table = tree_to_table(root)
+        self.assertEqual(len(table["nodes"]), 5001)
+        self.assertEqual(len(table["states"]), 3)
+        self.assertEqual(table["nodes"][-1]["parent_id"], 4999)
+        self.assertNotIn("list_state", table["nodes"][0]["op"])
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            print_tree(root)
+
+    def test_decision_tree_from_trace_matches_log(self):
+        arr = [5, 3, 9, 1, 7, 3, 8, 2, 6, 4, 0, 5]
+        for sort_func in (bubble_sort_with_log, merge_sort_with_log):
+            _, trace = sort_func(arr, compact=True)
+            for max_nodes in (7, 100):
+                from_log = tree_to_table(build_decision_tree(trace.to_log(), max_nodes))
+                self.assertEqual(tree_to_table(build_decision_tree(trace, max_nodes)), from_log)
+
+    def test_decision_tree_sampling_keeps_state_changes(self):
+        # Few swaps among many comparisons: every swap survives the budget
+        arr = list(range(60))
+        arr[10], arr[11], arr[40], arr[42] = arr[11], arr[10], arr[42], arr[40]
+        _, trace = bubble_sort_with_log(arr, compact=True)
+        swaps = trace.count("swap")
+        table = tree_to_table(build_decision_tree(trace, max_nodes=40))
+        self.assertEqual(len(table["nodes"]), 40)
+        kept = [node["op"]["type"] for node in table["nodes"][1:]]
+        self.assertEqual(kept.count("swap"), swaps)
+        self.assertGreater(swaps, 0)
+
+        # Many swaps: the budget is filled with state changes only, from a
+        # generator that is read once
+        _, trace = bubble_sort_with_log(list(range(60, 0, -1)), compact=True)
+        root = build_decision_tree(trace.iter_log(), max_nodes=40)
+        table = tree_to_table(root)
+        self.assertEqual(len(table["nodes"]), 40)
+        self.assertEqual({node["op"]["type"] for node in table["nodes"][1:]}, {"swap"})
+        self.assertEqual(table, tree_to_table(build_decision_tree(trace, max_nodes=40)))
+
+    def test_tree_store_matches_tree_nodes(self):
+        _, trace = merge_sort_with_log([9, 4, 7, 1, 8, 2, 6, 3, 5, 0] * 3, compact=True)
+        for max_nodes in (1, 25, 10000):
+            tree = build_decision_tree(trace, max_nodes)
+            store = build_tree_store(trace, max_nodes)
+            self.assertEqual(len(store), min(max_nodes, len(trace)))
+            self.assertEqual(json.dumps(tree_to_table(store.root)), json.dumps(tree_to_table(tree)))
+            self.assertEqual(get_subtree(store.root, 3).state, get_subtree(tree, 3).state)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            print_tree(store.root)
+        self.assertLess(store.nbytes, 25 * len(store))
+        self.assertIsNone(build_tree_store([]).root)
+
+    def test_zobrist_hash_tracks_state(self):
+        state_hash = ZobristHash([1, 2, 3])
+        self.assertNotEqual(state_hash.apply([(0, 2), (1, 1)]), ZobristHash([1, 2, 3]).value)
+        self.assertEqual(state_hash.value, ZobristHash([2, 1, 3]).value)
+        self.assertEqual(state_hash.apply([(0, 1), (1, 2)]), ZobristHash([1, 2, 3]).value)
+
+    def test_from_log_round_trip(self):
+        _, log = bubble_sort_with_log([3, 1, 2])
+        trace = CompactTrace.from_log(log, initial_state=[3, 1, 2], checkpoint_interval=2)
+        self.assertEqual(trace.to_log(), log)
+
+
+class AnalysisTestCase(unittest.TestCase):
+    def test_parallel_analysis_is_reproducible(self):
+        serial = run_analysis(seed=7, max_workers=1)
+        reported = {}
+        parallel = run_analysis(seed=7, max_workers=2,
+                                on_size_complete=lambda n, results: reported.setdefault(n, results))
+        self.assertEqual(serial["seed"], 7)
+        self.assertEqual(serial["analysis_results"], parallel["analysis_results"])
+        self.assertEqual(reported, parallel["analysis_results"])
+        self.assertEqual(list(parallel["analysis_results"]), DEFAULT_TEST_SIZES)
+        self.assertEqual(
+            analyze_algorithm(quick_sort, 20, seed=7),
+            serial["analysis_results"][20]["Quick Sort"]["average_comparisons"]
+        )
+
+    def test_concurrent_profiles_share_tracemalloc(self):
+        arrays = [list(range(2000, 0, -1))] * 3
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(profile_sort(merge_sort, arrays)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result["peak_bytes"] > 0 for result in results))
+        self.assertFalse(tracemalloc.is_tracing())
+        tracemalloc.start()
+        try:
+            profile_sort(merge_sort, arrays)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_batch_mode_matches_scalar(self):
+        scalar = run_analysis(seed=11)
+        batch = run_analysis(seed=11, batch=True)
+        self.assertEqual(scalar["analysis_results"], batch["analysis_results"])
+
+    def test_batch_counts_on_duplicates_and_distinct_values(self):
+        rng = np.random.default_rng(5)
+        for high in (3, 10 ** 6):
+            matrix = rng.integers(0, high, (40, 37))
+            for algorithm, sort_func in SORTING_ALGORITHMS.items():
+                expected = [sort_func(row.tolist(), track_comparisons=True) for row in matrix]
+                self.assertEqual(batch_comparison_counts(algorithm, matrix).tolist(), expected)
+        self.assertEqual(count_inversions(np.array([[3, 1, 2, 2, 0]])).tolist(), [7])
+
+    def test_cache_tiers_and_invalidation(self):
+        path = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+        cache = AnalysisCache(path, max_entries=1)
+        first = run_analysis(seed=3, cache=cache)
+        self.assertEqual(cache.get(quick_sort, 50, 100, 3), cache.get(quick_sort, 50, 100, 3))
+
+        # A fresh instance is served from the on-disk tier
+        reloaded = AnalysisCache(path)
+        self.assertIsNotNone(reloaded.get(bubble_sort, 10, 100, 3))
+        self.assertEqual(run_analysis(seed=3, cache=reloaded)["analysis_results"],
+                         first["analysis_results"])
+
+        # Different bytecode under the same name misses
+        def quick_sort_changed(arr, track_comparisons=False):
+            return 0
+        quick_sort_changed.__name__ = "quick_sort"
+        self.assertIsNone(reloaded.get(quick_sort_changed, 50, 100, 3))
+
+        reloaded.invalidate("bubble_sort")
+        self.assertIsNone(reloaded.get(bubble_sort, 10, 100, 3))
+        self.assertIsNotNone(reloaded.get(quick_sort, 10, 100, 3))
+
+    def test_hybrid_sort_inputs(self):
+        rng = np.random.default_rng(3)
+        inputs = [
+            list(range(300)), list(range(300, 0, -1)), [7] * 300,
+            list(range(150)) + list(range(150, 0, -1)),
+            rng.integers(0, 5, 300).tolist(), rng.integers(0, 10 ** 6, 1000).tolist()
+        ]
+        for arr in inputs:
+            self.assertEqual(hybrid_sort(list(arr)), sorted(arr))
+        # Presorted input is one natural run: n - 1 comparisons
+        self.assertEqual(hybrid_sort(list(range(1000)), track_comparisons=True), 999)
+        self.assertEqual(hybrid_sort(list(range(1000, 0, -1)), track_comparisons=True), 999)
+        # Sorted input is quick sort's worst case, but not introsort's
+        self.assertLess(hybrid_sort(list(range(500)) * 2, track_comparisons=True),
+                        quick_sort(list(range(500)) * 2, track_comparisons=True) // 10)
+
+    def test_bottom_up_merge_sorts(self):
+        rng = np.random.default_rng(8)
+        for n in (0, 1, 2, 3, 5, 8, 33, 100):
+            arr = rng.integers(0, 10, n).tolist()
+            for sort_func in (bottom_up_merge_sort, galloping_merge_sort):
+                self.assertEqual(sort_func(list(arr)), sorted(arr))
+        arr = rng.integers(0, 10 ** 6, 1024).tolist()
+        self.assertEqual(bottom_up_merge_sort(list(arr), track_comparisons=True),
+                         merge_sort(list(arr), track_comparisons=True))
+        # Two interleaved sorted runs: galloping skips most comparisons
+        runs = list(range(0, 2048, 2)) + list(range(1, 2048, 2))
+        self.assertLess(galloping_merge_sort(list(range(2048)), track_comparisons=True),
+                        bottom_up_merge_sort(list(range(2048)), track_comparisons=True))
+        self.assertEqual(galloping_merge_sort(list(runs)), sorted(runs))
+
+    def test_quick_and_heap_sort_deep_inputs(self):
+        # Sorted input drives Lomuto quick sort to depth n; no recursion limit
+        n = 5000
+        self.assertEqual(quick_sort(list(range(n)), track_comparisons=True), n * (n - 1) // 2)
+        self.assertEqual(quick_sort(list(range(n, 0, -1))), list(range(1, n + 1)))
+        self.assertEqual(heap_sort(list(range(n, 0, -1))), list(range(1, n + 1)))
+
+    def test_benchmark_baseline_round_trip(self):
+        records = run_benchmark(algorithms=["merge_sort", "quick_sort"], sizes=[64, 128],
+                                repeat=1)
+        self.assertEqual(len(records), 2 * 5 * 2)
+        for record in records:
+            arr = generate(record["distribution"], record["n"], seed=[0, record["n"]])
+            sort_func = SORTING_ALGORITHMS[record["algorithm"]]
+            self.assertEqual(record["comparisons"], sort_func(arr, track_comparisons=True))
+            self.assertGreater(record["peak_bytes"], 0)
+        path = os.path.join(tempfile.mkdtemp(), "baseline.csv")
+        save_csv(records, path)
+        baseline = load_baseline(path)
+        self.assertEqual(find_regressions(records, baseline), [])
+        baseline[0]["comparisons"] -= 1
+        regressions = find_regressions(records, baseline)
+        self.assertEqual([(r["metric"], r["n"]) for r in regressions], [("comparisons", 64)])
+
+    def test_input_distributions(self):
+        for name in DISTRIBUTIONS:
+            for n in (0, 1, 7, 64):
+                self.assertEqual(len(generate(name, n, seed=3)), n)
+        self.assertEqual(generate("median_of_3_killer", 8), [1, 5, 3, 7, 2, 4, 6, 8])
+        self.assertEqual(generate("organ_pipe", 5), [0, 1, 2, 1, 0])
+        self.assertEqual(sorted(generate("nearly_sorted", 200, seed=1)), list(range(200)))
+        # The default reproduces the draws analysis has always made
+        rng = np.random.default_rng(5)
+        legacy = [rng.integers(1, 100, 6) for _ in range(4)]
+        drawn = draw_arrays(DEFAULT_DISTRIBUTION, 6, 4, np.random.default_rng(5))
+        self.assertTrue(np.array_equal(drawn, legacy))
+        with self.assertRaises(ValueError):
+            generate("bogus", 4)
+
+    def test_presortedness_metrics(self):
+        rng = np.random.default_rng(2)
+        for n in (0, 1, 2, 9, 40):
+            for arr in (rng.integers(0, 5, n).tolist(), rng.permutation(n).tolist()):
+                brute = sum(arr[i] > arr[j] for i in range(n) for j in range(i + 1, n))
+                self.assertEqual(inversions(arr), brute)
+                longest = max((len(c) for k in range(min(n, 9) + 1)
+                               for c in itertools.combinations(arr[:9], k)
+                               if list(c) == sorted(c)), default=0)
+                self.assertEqual(longest_increasing_subsequence(arr[:9]), longest)
+                self.assertEqual(sum(run_lengths(arr)), n)
+        self.assertEqual(run_lengths([1, 2, 2, 5, 4, 3, 1, 6]), [4, 3, 1])
+        metrics = presortedness([3, 3, 3, 3])
+        self.assertEqual((metrics["runs"], metrics["entropy"]), (1, 0.0))
+        self.assertEqual(presortedness([1, 2, 3, 4])["entropy"], 2.0)
+
+        # The dispatcher's choice makes the fewest comparisons on each input
+        nearly_sorted = list(range(300))
+        nearly_sorted[0:2], nearly_sorted[100:102] = [1, 0], [101, 100]
+        for arr, expected in ((nearly_sorted, "insertion_sort"),
+                              (generate("organ_pipe", 500), "hybrid_sort"),
+                              (generate("permutation", 500, seed=1), "merge_sort")):
+            self.assertEqual(choose_algorithm(arr), expected)
+            counts = {name: SORTING_ALGORITHMS[name](list(arr), track_comparisons=True)
+                      for name in ("insertion_sort", "hybrid_sort", "merge_sort")}
+            self.assertEqual(min(counts, key=counts.get), expected)
+
+    def test_comparison_tree_matches_every_permutation(self):
+        for algorithm, sort_func in SORTING_ALGORITHMS.items():
+            counts = [sort_func(list(p), track_comparisons=True)
+                      for p in itertools.permutations(range(5))]
+            stats = ComparisonDAG(algorithm, 5).statistics()
+            self.assertEqual(stats["leaves"], 120)
+            self.assertAlmostEqual(stats["average_depth"], np.mean(counts))
+            self.assertEqual(stats["max_depth"], max(counts))
+            self.assertEqual(stats["min_depth"], min(counts))
+            self.assertLessEqual(stats["dag_nodes"], stats["tree_nodes"])
+            self.assertGreaterEqual(stats["min_depth"], 4)
+        tree = run_analysis(test_sizes=[4], iterations=10, seed=1)["tree_configurations"]
+        self.assertEqual(tree["Bubble Sort"]["max_depth"], 15)
+        with self.assertRaises(ValueError):
+            ComparisonDAG("bubble_sort", MAX_TREE_SIZE + 1)
+
+    def test_comparison_bounds(self):
+        sizes = np.array([0, 1, 2, 3, 10, 1023, 1024, 1500, 4096])
+        bounds = comparison_bounds(sizes)
+        for n, entropy, average, worst in zip(sizes, bounds["entropy"], bounds["average_case"],
+                                              bounds["worst_case"]):
+            factorial = math.factorial(int(n))
+            self.assertEqual(worst, (factorial - 1).bit_length())
+            self.assertAlmostEqual(entropy, math.log2(factorial), delta=1e-9 * max(entropy, 1))
+            self.assertTrue(entropy - 1e-9 <= average < entropy + 0.09)
+        # Three keys: the best tree has leaf depths 2, 2, 3, 3, 3, 3
+        self.assertAlmostEqual(average_case_lower_bound(3), 16 / 6)
+        self.assertEqual(worst_case_lower_bound(12), 29)
+        self.assertEqual(comparison_bounds(np.arange(10 ** 6))["worst_case"].shape, (10 ** 6,))
+        # No algorithm beats the bounds on average over all permutations
+        for stats in run_analysis(test_sizes=[5], iterations=10, seed=1, tree_size=5)[
+                "tree_configurations"].values():
+            self.assertGreaterEqual(stats["max_depth"], stats["information_theoretic_minimum"])
+            self.assertGreaterEqual(stats["average_depth"], stats["average_case_minimum"] - 1e-9)
+        with self.assertRaises(ValueError):
+            worst_case_lower_bound(-1)
+
+    def test_exact_comparisons(self):
+        for algorithm, formula in MOMENT_FORMULAS.items():
+            for n in range(7):
+                tree = exact_comparisons(algorithm, n, max_tree_size=6)
+                counts = [SORTING_ALGORITHMS[algorithm](list(p), track_comparisons=True)
+                          for p in itertools.permutations(range(n))]
+                self.assertAlmostEqual(tree["mean"], np.mean(counts))
+                self.assertAlmostEqual(tree["variance"], np.var(counts))
+                self.assertEqual(tree["method"], "tree")
+                self.assertAlmostEqual(sum(tree["distribution"]), 1.0)
+                mean, variance = formula(n)
+                self.assertAlmostEqual(mean, tree["mean"])
+                self.assertAlmostEqual(variance, tree["variance"])
+        n = 1000
+        harmonic = sum(1 / k for k in range(1, n + 1))
+        quick = exact_comparisons("quick_sort", n)
+        self.assertAlmostEqual(quick["mean"], 2 * (n + 1) * harmonic - 4 * n)
+        self.assertEqual(quick["method"], "formula")
+        self.assertIsNone(exact_comparisons("heap_sort", n))
+
+        results = run_analysis(test_sizes=[5, 40], iterations=20, seed=3, tree_size=5,
+                               distribution="permutation")["analysis_results"]
+        self.assertEqual(results[5]["Heap Sort"]["exact"], "tree")
+        self.assertEqual(results[40]["Heap Sort"]["iterations"], 20)
+        merge = results[40]["Merge Sort"]
+        self.assertEqual((merge["exact"], merge["iterations"]), ("formula", 0))
+        self.assertEqual(merge["confidence_half_width"], 0.0)
+        self.assertEqual(merge["average_comparisons"], merge_sort_moments(40)[0])
+
+
 if __name__ == '__main__':
     unittest.main()